@@ -0,0 +1,325 @@
+import subprocess # Import subprocess to list and launch applications.
+import threading # Import threading to build and refresh the index in the background.
+import shlex # Import shlex to split launch commands on Linux.
+import json # Import json to persist the index.
+import time # Import time for the refresh schedule.
+import sys # Import sys to pick the platform-specific listing.
+import os # Import os for file handling.
+import re # Import re to normalize application names.
+
+# Aliases that ship with the assistant; learned aliases are added on top of these.
+DefaultAliases = {
+    "vs code": "visual studio code",
+    "vscode": "visual studio code",
+    "code": "visual studio code",
+    "chrome": "google chrome",
+    "edge": "microsoft edge",
+    "word": "word",
+    "ms word": "word",
+    "microsoft word": "word",
+    "excel": "excel",
+    "microsoft excel": "excel",
+    "powerpoint": "powerpoint",
+    "microsoft powerpoint": "powerpoint",
+    "file explorer": "file explorer",
+    "explorer": "file explorer",
+    "calculator": "calculator",
+    "notepad plus plus": "notepad++",
+    "settings": "settings",
+}
+
+# Lower-case, drop punctuation, articles and a trailing "app", so "the WhatsApp app" and "whatsapp" are the same key.
+def NormalizeAppName(name):
+    name = re.sub(r"[^\w+]+", " ", name.lower()).strip()
+    name = re.sub(r"^(?:the|my)\s+", "", name)
+    name = re.sub(r"\s+(?:app|application|program)$", "", name)
+    return " ".join(name.split())
+
+# Character trigrams of a normalized name, padded so short names still have some.
+def Trigrams(name):
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+# Symbols that tell products apart, as in "Notepad" and "Notepad++" or "C" and "C#".
+def Symbols(name):
+    return set(re.sub(r"[\w\s]", "", name))
+
+# First letters of the words of a name: "visual studio code" -> "vsc".
+def Initials(name):
+    return "".join(word[0] for word in name.split())
+
+# List the launchable applications of this machine as [{"name", "target", "executable"}].
+def ScanApplications():
+    if sys.platform == "win32":
+        return ScanWindowsApplications()
+    return ScanDesktopEntries()
+
+# Windows: the Start menu apps, both desktop programs and Store apps, with their AppUserModelIDs.
+def ScanWindowsApplications():
+    output = subprocess.run(
+        ["powershell", "-NoProfile", "-Command", "Get-StartApps | ConvertTo-Json -Compress"],
+        capture_output=True, text=True, timeout=60, creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
+    ).stdout
+    apps = json.loads(output or "[]")
+    if isinstance(apps, dict):
+        apps = [apps] # A single app is not wrapped in a list.
+    entries = []
+    for app in apps:
+        target = app.get("AppID") or ""
+        executable = os.path.basename(target) if target.lower().endswith(".exe") else None
+        entries.append({"name": app.get("Name") or "", "target": target, "executable": executable})
+    return entries
+
+# Launchers that start another program; their own name says nothing about the application's process.
+Wrappers = {"env", "sh", "bash", "dash", "zsh", "flatpak", "snap", "gtk-launch", "xdg-open", "exo-open", "gio", "sudo", "pkexec", "nice", "ionice", "python", "python3", "java"}
+
+# Process name of a .desktop Exec= command, skipping "env VAR=value"; None when it runs through another launcher.
+def DesktopExecutable(command):
+    try:
+        words = shlex.split(command)
+    except ValueError:
+        return None
+    if words and words[0] == "env":
+        words = [word for word in words[1:] if "=" not in word and not word.startswith("-")]
+    if not words or os.path.basename(words[0]) in Wrappers:
+        return None
+    return os.path.basename(words[0])
+
+# Linux and other desktops: the .desktop entries of the application menus.
+def ScanDesktopEntries():
+    entries = []
+    for folder in ApplicationFolders():
+        for root, _, files in os.walk(folder):
+            for file_name in files:
+                if not file_name.endswith(".desktop"):
+                    continue
+                fields = {}
+                try:
+                    with open(os.path.join(root, file_name), "r", encoding="utf-8", errors="ignore") as f:
+                        for line in f:
+                            if line.startswith("[") and fields:
+                                break # Only the [Desktop Entry] section.
+                            key, _, value = line.strip().partition("=")
+                            fields.setdefault(key, value)
+                except OSError:
+                    continue
+                if fields.get("Name") and fields.get("Exec") and fields.get("NoDisplay", "false") != "true":
+                    command = re.sub(r"\s%[a-zA-Z]", "", fields["Exec"])
+                    entries.append({"name": fields["Name"], "target": command, "executable": DesktopExecutable(command)})
+    return entries
+
+# Folders whose contents change when applications are installed or removed.
+def ApplicationFolders():
+    if sys.platform == "win32":
+        return [
+            os.path.join(os.environ.get("ProgramData", r"C:\ProgramData"), "Microsoft", "Windows", "Start Menu", "Programs"),
+            os.path.join(os.environ.get("APPDATA", ""), "Microsoft", "Windows", "Start Menu", "Programs"),
+        ]
+    return ["/usr/share/applications", "/usr/local/share/applications", os.path.expanduser("~/.local/share/applications")]
+
+# Modification times of the application folders; a change means the index is out of date.
+def FolderSignature():
+    signature = []
+    for folder in ApplicationFolders():
+        for root, _, _ in os.walk(folder):
+            try:
+                signature.append(f"{root}:{os.path.getmtime(root)}")
+            except OSError:
+                pass
+    return "|".join(sorted(signature))
+
+# Persisted index of installed applications with exact, alias and trigram lookups.
+class AppIndex:
+    def __init__(self, path=os.path.join("Data", "AppIndex.json"), threshold=0.6, margin=0.1, check_interval=60, max_age=24 * 3600):
+        self.path = path
+        self.threshold = threshold # Minimum fuzzy score for a match.
+        self.margin = margin # The best match must beat the second best by this much, or the name is ambiguous.
+        self.check_interval = check_interval # Seconds between checks of the application folders.
+        self.max_age = max_age # The index is rebuilt at least this often, for Store apps outside the folders.
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock() # Serializes writes of the index file.
+        self._ready = threading.Event() # Set once an index is loaded or built.
+        self._apps = [] # Entries by position.
+        self._by_name = {} # Normalized name -> entry.
+        self._postings = {} # Trigram -> set of entry positions.
+        self._aliases = dict(DefaultAliases) # Normalized spoken name -> normalized application name.
+        self._signature = ""
+        self._built = 0.0
+        self._thread = None
+
+    # Swap in a new list of applications and rebuild the lookup tables.
+    def _Install(self, apps, signature, built):
+        by_name = {}
+        postings = {}
+        for position, app in enumerate(apps):
+            key = NormalizeAppName(app["name"])
+            if not key or key in by_name:
+                continue
+            by_name[key] = app
+            for gram in Trigrams(key):
+                postings.setdefault(gram, set()).add(position)
+        with self._lock:
+            self._apps, self._by_name, self._postings = apps, by_name, postings
+            self._signature, self._built = signature, built
+        self._ready.set()
+
+    def _Load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        with self._lock:
+            self._aliases.update(data.get("aliases", {}))
+        self._Install(data.get("apps", []), data.get("signature", ""), data.get("built", 0.0))
+        return True
+
+    def _Save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with self._save_lock: # The state is read under the write lock too, so a slow writer never saves an older copy last.
+            with self._lock:
+                data = {"built": self._built, "signature": self._signature, "apps": self._apps,
+                        "aliases": {alias: name for alias, name in self._aliases.items() if DefaultAliases.get(alias) != name}}
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+
+    # Scan the installed applications now and persist the result.
+    def Rebuild(self):
+        signature = FolderSignature()
+        apps = ScanApplications()
+        self._Install(apps, signature, time.time())
+        self._Save()
+        print(f"Application index: {len(self._by_name)} applications")
+
+    # Load the persisted index at once and keep it fresh on a background thread.
+    def Start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._Refresh, name="AppIndex", daemon=True)
+        self._Load()
+        self._thread.start()
+
+    def _Refresh(self):
+        while True:
+            try:
+                if not self._ready.is_set() or time.time() - self._built > self.max_age or FolderSignature() != self._signature:
+                    self.Rebuild()
+            except Exception as e:
+                print(f"Application index error: {e}")
+            time.sleep(self.check_interval)
+
+    # Fuzzy score of a candidate: trigram similarity, with bonuses for initials and whole-word matches.
+    def _Score(self, query, grams, key):
+        if Symbols(query) != Symbols(key):
+            return 0.0
+        candidate = Trigrams(key)
+        score = 2 * len(grams & candidate) / (len(grams) + len(candidate))
+        if query.replace(" ", "") == Initials(key):
+            score = max(score, 0.9)
+        if f" {query} " in f" {key} ":
+            score = max(score, 0.75)
+        elif len(query) >= 4 and f" {key}".find(f" {query}") != -1:
+            score = max(score, 0.7) # A spoken short form, e.g. "calc" for "calculator".
+        return score
+
+    # Return the application for a spoken name, or None. Known names and aliases are a dictionary lookup;
+    # a fuzzy match is only remembered once the caller confirms it worked. `fuzzy=False` allows exact matches only.
+    def Resolve(self, name, wait=0.0, fuzzy=True):
+        if not self._ready.is_set():
+            self.Start()
+            self._ready.wait(wait)
+        query = NormalizeAppName(name)
+        with self._lock:
+            app = self._by_name.get(query) or self._by_name.get(self._aliases.get(query) or "")
+            if app is not None or not query or not fuzzy:
+                return app
+
+            # Score only the applications sharing at least one trigram with the query.
+            grams = Trigrams(query)
+            candidates = set()
+            for gram in grams:
+                candidates |= self._postings.get(gram, set())
+            scores = sorted(((self._Score(query, grams, key), key) for key in {NormalizeAppName(self._apps[position]["name"]) for position in candidates}), reverse=True)
+            if not scores or scores[0][0] < self.threshold:
+                return None
+            if len(scores) > 1 and scores[0][0] - scores[1][0] < self.margin:
+                return None # Ambiguous, e.g. "microsoft" among the Microsoft apps.
+            return self._by_name[scores[0][1]]
+
+    # Resolve several names under one look at the index, e.g. for "open chrome and spotify"; names in `exact` never match fuzzily.
+    def ResolveMany(self, names, wait=0.0, exact=()):
+        return {name: self.Resolve(name, wait, fuzzy=NormalizeAppName(name) not in exact) for name in names}
+
+    # Learn a fuzzy match once opening or closing the app worked, so the next time the name is a direct lookup.
+    def Confirm(self, name, app):
+        alias, target = NormalizeAppName(name), NormalizeAppName(app["name"])
+        with self._lock:
+            if not alias or alias == target or self._aliases.get(alias) == target:
+                return
+            self._aliases[alias] = target
+        threading.Thread(target=self._Save, daemon=True).start()
+
+    # Remember that a spoken name means a given application, replacing any earlier alias.
+    def Learn(self, alias, name):
+        with self._lock:
+            self._aliases[NormalizeAppName(alias)] = NormalizeAppName(name)
+        self._Save()
+
+    # Forget an alias, learned or built in; the name goes back to fuzzy matching.
+    def Forget(self, alias):
+        alias = NormalizeAppName(alias)
+        with self._lock:
+            if alias in DefaultAliases:
+                self._aliases[alias] = None # Saved as null so the built-in alias stays off after a restart.
+            else:
+                self._aliases.pop(alias, None)
+        self._Save()
+
+    # Aliases in use, built-in and learned.
+    def Aliases(self):
+        with self._lock:
+            return {alias: name for alias, name in self._aliases.items() if name}
+
+# Whether LaunchApp knows the launch worked; explorer.exe shell:AppsFolder reports nothing, so on Windows it does not.
+LaunchConfirmed = sys.platform != "win32"
+
+# Launch an indexed application without searching for it.
+def LaunchApp(app):
+    if sys.platform == "win32":
+        subprocess.Popen(["explorer.exe", f"shell:AppsFolder\\{app['target']}"])
+    else:
+        subprocess.Popen(shlex.split(app["target"]), start_new_session=True)
+    return True
+
+# Close an indexed application by its exact process name; returns False when the executable is unknown.
+def CloseIndexedApp(app):
+    executable = app.get("executable")
+    if not executable or executable in Wrappers:
+        return False
+    if sys.platform == "win32":
+        result = subprocess.run(["taskkill", "/IM", executable, "/F"], capture_output=True, creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+    else:
+        result = subprocess.run(["pkill", "-x", executable[:15]], capture_output=True) # Linux process names are cut to 15 characters.
+    return result.returncode == 0
+
+# Shared application index used by Automation.
+Apps = AppIndex()
+
+# Command line entry point: python -m Backend.AppIndex aliases | learn <alias> <application> | forget <alias> | rebuild
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    Apps._Load()
+    if command == "aliases":
+        for alias, name in sorted(Apps.Aliases().items()):
+            print(f"  {alias:<28} -> {name}")
+    elif command == "learn" and len(sys.argv) == 4:
+        Apps.Learn(sys.argv[2], sys.argv[3])
+    elif command == "forget" and len(sys.argv) == 3:
+        Apps.Forget(sys.argv[2])
+    elif command == "rebuild":
+        Apps.Rebuild()
+    else:
+        print("Usage: python -m Backend.AppIndex aliases | learn <alias> <application> | forget <alias> | rebuild")
@@ -0,0 +1,108 @@
+from urllib.parse import quote_plus, urlparse, parse_qs # Import URL helpers to encode queries and unwrap redirect links.
+from Backend.Config import env_vars, WebSession # Import the shared settings and HTTP session.
+from Backend.AppIndex import NormalizeAppName # Import the name normalization of the application index.
+from Backend.Cache import PersistentCache # Import the two-tier cache.
+from Backend.Tracing import Trace # Import the stage tracer.
+import html # Import html to unescape links taken from markup.
+import re # Import re for the targeted link extractor.
+import os # Import os for file handling.
+
+# Web pages of services people ask to "open" that are not installed apps; checked before any network call.
+KnownSites = {
+    "youtube": "https://www.youtube.com",
+    "gmail": "https://mail.google.com",
+    "google": "https://www.google.com",
+    "google drive": "https://drive.google.com",
+    "google maps": "https://maps.google.com",
+    "maps": "https://maps.google.com",
+    "google docs": "https://docs.google.com",
+    "google sheets": "https://sheets.google.com",
+    "facebook": "https://www.facebook.com",
+    "instagram": "https://www.instagram.com",
+    "twitter": "https://x.com",
+    "x": "https://x.com",
+    "linkedin": "https://www.linkedin.com",
+    "reddit": "https://www.reddit.com",
+    "whatsapp": "https://web.whatsapp.com",
+    "whatsapp web": "https://web.whatsapp.com",
+    "telegram": "https://web.telegram.org",
+    "netflix": "https://www.netflix.com",
+    "amazon": "https://www.amazon.com",
+    "prime video": "https://www.primevideo.com",
+    "spotify": "https://open.spotify.com",
+    "github": "https://github.com",
+    "stack overflow": "https://stackoverflow.com",
+    "wikipedia": "https://www.wikipedia.org",
+    "chatgpt": "https://chatgpt.com",
+    "outlook": "https://outlook.live.com",
+    "canva": "https://www.canva.com",
+    "pinterest": "https://www.pinterest.com",
+    "quora": "https://www.quora.com",
+}
+
+# The first organic result link of a Google results page: an <a> tag with jsname="UWckNb".
+ResultTag = re.compile(rb'<a\b[^>]*\bjsname="UWckNb"[^>]*>')
+ResultHref = re.compile(rb'\bhref="([^"]+)"')
+
+# Resolves an application name to a web page: curated sites, then the cache, then one bounded search.
+class AppLinkResolver:
+    def __init__(self, cache, connect_timeout=3.0, read_timeout=5.0, max_bytes=512 * 1024, miss_ttl=3600):
+        self.cache = cache
+        self.timeout = (connect_timeout, read_timeout) # Seconds to connect and between bytes received.
+        self.max_bytes = max_bytes # The page is read only until the first result, and never beyond this.
+        self.miss_ttl = miss_ttl # Names without a result are retried after this many seconds.
+
+    # Return the page for the name, or None when nothing was found.
+    def Resolve(self, name):
+        key = NormalizeAppName(name)
+        if not key:
+            return None
+        if key in KnownSites:
+            return KnownSites[key]
+        with Trace.Span("automation.link", app=key):
+            # A fresh search without a result is kept only for miss_ttl; reading a cached miss never extends it.
+            return self.cache.GetOrFetch(key, lambda: self.Search(key), ttl=lambda link: self.miss_ttl if link is None else None)
+
+    # Search the web for the name and return the first result link.
+    def Search(self, name):
+        url = f"https://www.google.com/search?q={quote_plus(name)}"
+        with WebSession().get(url, timeout=self.timeout, stream=True) as response:
+            if response.status_code != 200:
+                print(f"Failed to retrieve search results ({response.status_code}).")
+                return None
+            return FirstResultLink(response.iter_content(chunk_size=16 * 1024), self.max_bytes)
+
+# Scan the page as it arrives and stop at the first usable result link.
+def FirstResultLink(chunks, max_bytes):
+    buffer = b""
+    received = 0
+    for chunk in chunks:
+        received += len(chunk)
+        buffer += chunk
+        scanned = 0 # End of the last result tag looked at.
+        for match in ResultTag.finditer(buffer):
+            href = ResultHref.search(match.group(0))
+            link = ResultUrl(html.unescape(href.group(1).decode("utf-8", "ignore"))) if href else None
+            if link:
+                return link
+            scanned = match.end()
+        if received >= max_bytes:
+            break
+        # Keep only the tail, where a tag may have been cut between chunks; tags already looked at are dropped.
+        start = buffer.rfind(b"<", scanned)
+        buffer = buffer[start:] if start != -1 and len(buffer) - start < 4096 else b""
+    return None
+
+# Unwrap Google's /url?q=... redirect links into the target page; anything but an absolute http(s) URL is rejected.
+def ResultUrl(href):
+    if href.startswith("/url?"):
+        href = parse_qs(urlparse(href).query).get("q", [""])[0]
+    url = urlparse(href)
+    return href if url.scheme in ("http", "https") and url.netloc else None
+
+# Shared resolver used by Automation.
+AppLinks = AppLinkResolver(
+    PersistentCache(os.path.join("Data", "AppLinks.sqlite"), max_entries=int(env_vars.get("AppLinkCacheSize", 500)), ttl=30 * 24 * 3600),
+    connect_timeout=float(env_vars.get("AppLinkConnectTimeout", 3)),
+    read_timeout=float(env_vars.get("AppLinkReadTimeout", 5))
+)
@@ -0,0 +1,80 @@
+import hashlib # Import hashlib to derive content-addressed file names.
+import json # Import json to serialize cache keys deterministically.
+import threading # Import threading to guard the index from concurrent writers.
+import os # Import os for file handling.
+
+# On-disk LRU cache of synthesized audio files keyed by their content parameters.
+class AudioCache:
+    def __init__(self, directory, max_bytes, extension=".mp3"):
+        self.directory = directory # Folder holding the cached files.
+        self.max_bytes = max_bytes # Total size cap of the cache.
+        self.extension = extension
+        self._lock = threading.Lock()
+        self._entries = {} # File name -> (last use time, size in bytes).
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+        # Rebuild the index from the files already on disk; mtime doubles as last use time.
+        for name in os.listdir(directory):
+            if name.endswith(extension):
+                stat = os.stat(os.path.join(directory, name))
+                self._entries[name] = (stat.st_mtime, stat.st_size)
+
+    # Build the file name for a set of parameters, e.g. (text, voice, pitch, rate).
+    def Key(self, *params):
+        digest = hashlib.sha256(json.dumps(params, ensure_ascii=False).encode("utf-8")).hexdigest()
+        return digest + self.extension
+
+    # Return the cached path for the parameters, or None on a miss.
+    def Get(self, *params):
+        name = self.Key(*params)
+        path = os.path.join(self.directory, name)
+        with self._lock:
+            if name not in self._entries or not os.path.exists(path):
+                self._entries.pop(name, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            try:
+                os.utime(path) # Mark as recently used so it survives restarts in LRU order.
+                self._entries[name] = (os.path.getmtime(path), self._entries[name][1])
+            except OSError:
+                pass
+        return path
+
+    # Return the cached path, calling produce(temp_path) to create the file on a miss.
+    def GetOrCreate(self, produce, *params):
+        path = self.Get(*params)
+        if path is not None:
+            return path
+
+        name = self.Key(*params)
+        path = os.path.join(self.directory, name)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            produce(temp_path)
+            os.replace(temp_path, path) # Publish atomically so readers never see partial files.
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        with self._lock:
+            self._entries[name] = (os.path.getmtime(path), os.path.getsize(path))
+            self._Evict(keep=name)
+        return path
+
+    # Remove least recently used files until the cache fits its size cap.
+    def _Evict(self, keep):
+        total = sum(size for _, size in self._entries.values())
+        for name, (_, size) in sorted(self._entries.items(), key=lambda item: item[1][0]):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue # The file may still be open for playback; try again next time.
+            del self._entries[name]
+            total -= size
@@ -1,22 +1,16 @@
 # Import required libraries
 from AppOpener import close, open as appopen  # Import functions to open and close apps.
 from webbrowser import open as webopen  # Import web browser functionality.
-from pywhatkit import search, playonyt  # Import functions for Google search and YouTube playback.
-from dotenv import dotenv_values  # Import dotenv to manage environment variables.
-from bs4 import BeautifulSoup  # Import BeautifulSoup for parsing HTML content.
 from rich import print  # Import rich for styled console output.
-from groq import Groq  # Import Groq for AI chat functionalities.
+from Backend.Config import GroqClient  # Import the lazily created Groq client.
+from Backend.AppIndex import Apps, LaunchApp, LaunchConfirmed, CloseIndexedApp, NormalizeAppName  # Import the application index.
+from Backend.AppLinks import AppLinks, KnownSites  # Import the web page resolver for apps that are not installed.
 import webbrowser  # Import webbrowser for opening URLs.
 import subprocess  # Import subprocess for interacting with the system.
-import requests  # Import requests for making HTTP requests.
 import keyboard  # Import keyboard for keyboard-related actions.
 import asyncio  # Import asyncio for asynchronous programming.
 import os  # Import os for operating system functionalities.
 
-# Load environment variables from the .env file.
-env_vars = dotenv_values(".env")
-GroqAPIKey = env_vars.get("GroqAPIKey")  # Retrieve the Groq API key.
-
 # Define CSS classes for parsing specific elements in HTML content.
 classes = [
     "zCubwf", "hgKElc", "LTK00 sY7ric", "ZØLcW", "gsrt vk_bk FzvWSb YwPhnf", "pclqee", "tw-Data-text tw-text-small tw-ta",
@@ -24,12 +18,6 @@ classes = [
     "LWkfKe", "VQF4g", "qv3Wpe", "kno-rdesc", "SPZz6b"
 ]
 
-# Define a user-agent for making web requests.
-useragent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.75 Safari/537.36'
-
-# Initialize the Groq client with the API key.
-client = Groq(api_key=GroqAPIKey)
-
 # Predefined professional responses for user interactions.
 professional_responses = [
     "Your satisfaction is my top priority; feel free to reach out if there's anything else I can help you with.",
@@ -44,6 +32,7 @@ SystemChatBot = [{"role": "system", "content": "You are a helpful assistant. You
 
 # Function to perform a Google search.
 def GoogleSearch(Topic):
+    from pywhatkit import search  # Imported on use; pywhatkit checks the network when it is imported.
     search(Topic)  # Use pywhatkit's search function to perform a Google search.
     return True  # Indicate success.
 #GoogleSearch("sourav sec")
@@ -62,7 +51,7 @@ def Content(Topic):
     # Nested function to generate content using the AI chatbot.
     def ContentWriterAI(prompt):
         messages.append({"role": "user", "content": f"{prompt}"})  # Add the user's prompt to messages.
-        completion = client.chat.completions.create(
+        completion = GroqClient().chat.completions.create(
             model="mixtral-8x7b-32768",  # Specify the AI model.
             messages=SystemChatBot + messages,  # Include system instructions and chat history.
             max_tokens=2048,  # Limit the maximum tokens in the response.
@@ -107,45 +96,47 @@ def YouTubeSearch(Topic):
 
 # Function to play a video on YouTube.
 def PlayYoutube(query):
+    from pywhatkit import playonyt  # Imported on use; pywhatkit checks the network when it is imported.
     playonyt(query)  # Use pywhatkit's playonyt function to play the video on YouTube.
     return True  # Indicate success.
 
+# Function to look apps up in the index; known web services such as gmail only match an installed app of the same name.
+def FindApps(names):
+    return Apps.ResolveMany(names, exact=KnownSites)
+
 # Function to open an application or a relevant webpage.
-def OpenApp(app, sess=requests.Session()):
+def OpenApp(app, entry=None):
+    entry = entry or FindApps([app])[app]  # Look the app up in the index first.
     try:
+        if entry:
+            LaunchApp(entry)  # Launch the indexed app directly.
+            if LaunchConfirmed:
+                Apps.Confirm(app, entry)  # It worked, so the name may be learned as an alias.
+            return True  # Indicate success.
+        if NormalizeAppName(app) in KnownSites:
+            raise LookupError(app)  # Not installed: open the known web page instead of AppOpener's closest match.
         appopen(app, match_closest=True, output=True, throw_error=True)  # Attempt to open the app.
         return True  # Indicate success.
     except:
-        # Nested function to extract links from HTML content.
-        def extract_links(html):
-            if html is None:
-                return []
-            soup = BeautifulSoup(html, 'html.parser')  # Parse the HTML content.
-            links = soup.find_all('a', {'jsname': 'UWckNb'})  # Find relevant links.
-            return links
-
-        def search_google(query):
-            url = f"https://www.google.com/search?q={query}"  # Construct the Google search URL.
-            headers = {"User-Agent": useragent}  # Use the predefined user-agent.
-            response = sess.get(url, headers=headers)  # Perform the GET request.
-            if response.status_code == 200:
-                return response.text  # Return the HTML content.
-            else:
-                print("Failed to retrieve search results.")  # Print an error message.
-                return None
-
-        html = search_google(app)  # Perform the Google search.
-        if html:
-            link = extract_links(html)[0]  # Extract the first link from the search results.
+        try:
+            link = AppLinks.Resolve(app)  # Find the app's web page: known sites, cache, then one bounded search.
+        except Exception as e:
+            print(f"Failed to retrieve search results: {e}")  # Print an error message.
+            return False  # Indicate failure.
+        if link:
             webbrowser.open(link)  # Open the link in a web browser.
             return True  # Indicate success.
         return False  # Indicate failure.
 
 # Function to close an application.
-def CloseApp(app):
+def CloseApp(app, entry=None):
     if "chrome" in app:
         pass  # Skip if the app is Chrome.
     else:
+        entry = entry or FindApps([app])[app]  # Look the app up in the index first.
+        if entry and CloseIndexedApp(entry):
+            Apps.Confirm(app, entry)  # It worked, so the name may be learned as an alias.
+            return True  # Indicate success.
         try:
             close(app, match_closest=True, output=True, throw_error=True)  # Attempt to close the app.
             return True  # Indicate success.
@@ -184,15 +175,20 @@ def System(command):
 # Asynchronous function to translate and execute user commands.
 async def TranslateAndExecute(commands: list[str]):
     funcs = []
+    # Resolve every app named in the commands in one pass over the index.
+    names = [command.removeprefix("open ").removeprefix("close ") for command in commands if command.startswith(("open ", "close "))]
+    resolved = await asyncio.to_thread(FindApps, names)  # Off the event loop; the first lookup may read the index file.
     for command in commands:
         if command.startswith("open "):  # Handle "open" commands.
             if "open it" in command or "open file" == command:
                 pass  # Ignore "open it" and "open file" commands.
             else:
-                fun = asyncio.to_thread(OpenApp, command.removeprefix("open "))  # Schedule app opening.
+                app = command.removeprefix("open ")
+                fun = asyncio.to_thread(OpenApp, app, entry=resolved.get(app))  # Schedule app opening.
                 funcs.append(fun)
         elif command.startswith("close "):  # Handle "close" commands.
-            fun = asyncio.to_thread(CloseApp, command.removeprefix("close "))  # Schedule app closing.
+            app = command.removeprefix("close ")
+            fun = asyncio.to_thread(CloseApp, app, entry=resolved.get(app))  # Schedule app closing.
             funcs.append(fun)
         elif command.startswith("play "):  # Handle "play" commands.
             fun = asyncio.to_thread(PlayYoutube, command.removeprefix("play "))  # Schedule YouTube playback.
@@ -0,0 +1,246 @@
+import argparse # Import argparse for the command line.
+import tempfile # Import tempfile for the isolated working directory.
+import json # Import json for profiles and the report.
+import time # Import time to measure the turns.
+import sys # Import sys to reach the repository root.
+import os # Import os for file handling.
+
+# Offline benchmark: drives MainExecution turn after turn with every external service replaced by a local stand-in
+# from Backend.Fakes, and reports throughput, latency distributions, per-stage timings and memory.
+#
+#   python -m Backend.Benchmark --turns 30 --time-scale 0.2 --profile profile.json --output report.json
+#
+# The run happens in a fresh working directory with its own .env, chat log, caches and trace, so results are reproducible.
+
+# Repository root, so Main and the backend can be imported after changing directory.
+Root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Latency (seconds), jitter, error rate and service options of each stand-in; a profile file overrides any of them.
+DefaultProfile = {
+    "groq": {"latency": 0.3, "jitter": 0.1, "error_rate": 0.0, "words": 60, "chunk_words": 1, "chunk_interval": 0.02},
+    "cohere": {"latency": 0.4, "jitter": 0.1, "error_rate": 0.0},
+    "search": {"latency": 0.8, "jitter": 0.3, "error_rate": 0.0},
+    "tts": {"latency": 0.35, "jitter": 0.1, "error_rate": 0.0},
+    "playback": {"latency": 0.0, "words_per_second": 2.5},
+    "translate": {"latency": 0.3, "jitter": 0.1, "error_rate": 0.0},
+    "images": {"latency": 3.0, "jitter": 1.0, "error_rate": 0.1},
+    "automation": {"latency": 0.2, "jitter": 0.05, "error_rate": 0.0},
+}
+
+# Utterances replayed when no script is given: general and realtime questions, commands and an image request.
+DefaultScript = [
+    "how are you today",
+    "what is the latest news about space exploration",
+    "open chrome",
+    "tell me about mahatma gandhi",
+    "what is the weather in delhi today",
+    "generate image of a lighthouse at sunset",
+    "explain how a rainbow forms",
+    "play despacito",
+    "who is the current president of france",
+    "tell me a fun fact about octopuses",
+]
+
+# Value at the given percentile, nearest-rank method.
+def Percentile(values, percent):
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+# Count, mean and percentiles of durations in seconds, reported in milliseconds.
+def Distribution(values):
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) * 1000,
+        "p50": Percentile(values, 50) * 1000,
+        "p95": Percentile(values, 95) * 1000,
+        "p99": Percentile(values, 99) * 1000,
+        "max": max(values) * 1000,
+    }
+
+# Overlay a profile file on the defaults, service by service.
+def LoadProfile(path=None):
+    profile = {name: dict(settings) for name, settings in DefaultProfile.items()}
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            for name, settings in json.load(f).items():
+                profile.setdefault(name, {}).update(settings)
+    return profile
+
+# Peak resident memory of the process in megabytes, where the platform reports it.
+def PeakRSS():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+# Prepare the working directory: .env, replay script and Data folder. Returns the directory.
+def PrepareWorkdir(workdir, script, time_scale, extra_env):
+    os.makedirs(os.path.join(workdir, "Data"), exist_ok=True)
+    script_path = os.path.join(workdir, "Data", "Replay.txt")
+    with open(script_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(script) + "\n")
+
+    settings = {
+        "Username": "Benchmark",
+        "Assistantname": "Jarvis",
+        "InputLanguage": "en",
+        "AssistantVoice": "en-US-AriaNeural",
+        "SpeechBackend": "replay",
+        "SpeechReplaySource": script_path,
+        "SpeechReplayTimeScale": time_scale,
+        "SpeechReplayLoop": "True",
+        "TraceTurns": "True",
+    }
+    settings.update(extra_env)
+    with open(os.path.join(workdir, ".env"), "w", encoding="utf-8") as f:
+        for key, value in settings.items():
+            f.write(f"{key}={value}\n")
+    return workdir
+
+# Run the benchmark and return the report.
+def RunBenchmark(turns=20, profile=None, script=None, time_scale=1.0, seed=0, workdir=None, extra_env=None, trace_memory=False, image_wait=60):
+    profile = profile or LoadProfile()
+    workdir = PrepareWorkdir(workdir or tempfile.mkdtemp(prefix="benchmark-"), script or DefaultScript, time_scale, extra_env or {})
+    os.chdir(workdir) # Every module reads .env and Data relative to the working directory, so this must happen before importing them.
+    sys.path.insert(0, Root)
+
+    if trace_memory:
+        import tracemalloc
+        tracemalloc.start()
+
+    from Backend import Fakes, Config
+    Groq = Fakes.FakeGroq(time_scale=time_scale, seed=seed, **profile["groq"])
+    Cohere = Fakes.FakeCohere(time_scale=time_scale, seed=seed + 1, **profile["cohere"])
+    Search = Fakes.FakeSearch(time_scale=time_scale, seed=seed + 2, **profile["search"])
+    EdgeTTS = Fakes.FakeEdgeTTS(time_scale=time_scale, seed=seed + 3, **profile["tts"])
+    Player = Fakes.FakePlayer(time_scale=time_scale, seed=seed + 4, **profile["playback"])
+    Translate = Fakes.FakeTranslate(time_scale=time_scale, seed=seed + 5, **profile["translate"])
+    Images = Fakes.FakeImageServer(time_scale=time_scale, seed=seed + 6, **profile["images"])
+    AutomationService = Fakes.FakeAutomation(time_scale=time_scale, seed=seed + 7, **profile["automation"])
+    Config.UseClient("groq", Groq)
+    Config.UseClient("cohere", Cohere)
+
+    import Main
+    from Backend import RealtimeSearchEngine, TextToSpeech, SpeechToText, ImageGeneration
+    from Backend.Tracing import Summary
+    RealtimeSearchEngine.search = Search
+    TextToSpeech.edge_tts = EdgeTTS
+    TextToSpeech.Player = Player
+    SpeechToText.Translation.translate = Translate
+    ImageGeneration.API_URL = Images.url
+    ImageGeneration.show_image = lambda image_path: None
+    Main.Automation = AutomationService
+
+    # Remember when each utterance ends, so response latency excludes the time spent speaking.
+    Heard = []
+    Listen = SpeechToText.Recognizer.Listen
+    def TimedListen():
+        text = Listen()
+        Heard.append(time.perf_counter())
+        return text
+    SpeechToText.Recognizer.Listen = TimedListen
+
+    # Keep the image jobs to report how long they took.
+    Jobs = []
+    Submit = Main.ImageWorker.Submit
+    def TimedSubmit(prompt, reuse=None):
+        job = Submit(prompt, reuse)
+        Jobs.append((time.perf_counter(), job))
+        return job
+    Main.ImageWorker.Submit = TimedSubmit
+
+    TurnSeconds = []
+    ResponseSeconds = []
+    Errors = []
+    started = time.perf_counter()
+    for number in range(turns):
+        turn_start = time.perf_counter()
+        heard_before = len(Heard)
+        try:
+            Main.MainExecution()
+        except Exception as e:
+            Errors.append(f"turn {number + 1}: {e}")
+            continue
+        end = time.perf_counter()
+        TurnSeconds.append(end - turn_start)
+        if len(Heard) > heard_before:
+            ResponseSeconds.append(end - Heard[-1])
+    wall = time.perf_counter() - started
+
+    # Image jobs run in the background; give them a bounded time to finish.
+    ImageSeconds = []
+    deadline = time.perf_counter() + image_wait
+    for submitted, job in Jobs:
+        try:
+            job.future.result(timeout=max(0.0, deadline - time.perf_counter()))
+            ImageSeconds.append(time.perf_counter() - submitted)
+        except Exception as e:
+            Errors.append(f"image '{job.prompt}': {e or type(e).__name__}")
+
+    memory = {"rss_peak_mb": PeakRSS()}
+    if trace_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        memory.update(python_current_mb=current / 2 ** 20, python_peak_mb=peak / 2 ** 20)
+        tracemalloc.stop()
+
+    Images.Close()
+    return {
+        "workdir": workdir,
+        "turns": turns,
+        "completed": len(TurnSeconds),
+        "errors": Errors,
+        "wall_seconds": wall,
+        "turns_per_minute": len(TurnSeconds) / wall * 60 if wall else 0.0,
+        "turn_ms": Distribution(TurnSeconds),
+        "response_ms": Distribution(ResponseSeconds), # From the end of the utterance to the end of the spoken answer.
+        "image_job_ms": Distribution(ImageSeconds),
+        "stages_ms": Summary(turns),
+        "services": {service.name: service.Stats() for service in (Groq, Cohere, Search, EdgeTTS, Player, Translate, Images, AutomationService)},
+        "memory": memory,
+    }
+
+def PrintReport(report):
+    print(f"\nBenchmark: {report['completed']}/{report['turns']} turns in {report['wall_seconds']:.1f}s "
+          f"({report['turns_per_minute']:.1f} turns/min), workdir {report['workdir']}")
+    for label in ("turn_ms", "response_ms", "image_job_ms"):
+        stats = report[label]
+        if stats["count"]:
+            print(f"  {label:<14} n={stats['count']:<4} mean {stats['mean']:8.1f}  p50 {stats['p50']:8.1f}  "
+                  f"p95 {stats['p95']:8.1f}  p99 {stats['p99']:8.1f}  max {stats['max']:8.1f}")
+    print("  Stages (ms):")
+    for name, stats in report["stages_ms"].items():
+        print(f"    {name:<26} n={stats['count']:<5} p50 {stats['p50']:8.1f}  p95 {stats['p95']:8.1f}  p99 {stats['p99']:8.1f}")
+    print("  Services: " + ", ".join(f"{name} {stats['calls']} calls/{stats['errors']} errors" for name, stats in report["services"].items()))
+    print("  Memory: " + ", ".join(f"{key} {value:.1f}" for key, value in report["memory"].items() if value is not None))
+    for error in report["errors"]:
+        print(f"  Error: {error}")
+
+# Command line entry point: python -m Backend.Benchmark [options]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark of the voice pipeline with local stand-ins for every external service.")
+    parser.add_argument("--turns", type=int, default=20, help="Number of turns to run.")
+    parser.add_argument("--profile", help="JSON file overriding the latency, jitter, error rate and options of the stand-ins.")
+    parser.add_argument("--script", help="Replay source: a .txt or .jsonl transcript, a WAV file or a folder of WAV files.")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Multiplier of every simulated delay: 0.5 runs twice as fast, 0 runs without waiting.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the latency jitter and injected errors.")
+    parser.add_argument("--workdir", help="Working directory to use instead of a fresh temporary one.")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra .env setting, e.g. --env FastPathThreshold=0.9.")
+    parser.add_argument("--trace-memory", action="store_true", help="Also report Python heap usage with tracemalloc (slower).")
+    parser.add_argument("--output", help="Write the report as JSON to this file.")
+    args = parser.parse_args()
+
+    extra_env = dict(item.split("=", 1) for item in args.env)
+    if args.script:
+        extra_env["SpeechReplaySource"] = os.path.abspath(args.script) # Replaces the generated default script.
+    output = os.path.abspath(args.output) if args.output else None
+
+    report = RunBenchmark(args.turns, LoadProfile(args.profile), None, args.time_scale, args.seed, args.workdir, extra_env, args.trace_memory)
+    PrintReport(report)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
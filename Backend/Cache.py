@@ -0,0 +1,117 @@
+from collections import OrderedDict # Import OrderedDict for the in-memory LRU order.
+from concurrent.futures import Future # Import Future to share one fetch between concurrent callers.
+import threading # Import threading to make the cache safe across threads.
+import sqlite3 # Import sqlite3 for the persistent tier.
+import json # Import json to store values of any JSON type.
+import time # Import time for expiry and last-use timestamps.
+import os # Import os for directory handling.
+
+# Cache with a TTL per entry and LRU eviction, kept in memory and persisted in SQLite across restarts.
+class PersistentCache:
+    def __init__(self, path, max_entries=256, ttl=24 * 3600, max_memory_entries=None):
+        self.path = path # SQLite file of the persistent tier.
+        self.max_entries = max_entries # Maximum number of entries kept on disk.
+        self.max_memory_entries = max_memory_entries or max_entries # Maximum number of entries kept in memory.
+        self.ttl = ttl # Default time to live in seconds.
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0 # Lookups that waited for a fetch already in flight.
+        self._lock = threading.Lock()
+        self._memory = OrderedDict() # key -> (value, expires), least recently used first.
+        self._inflight = {} # key -> Future of the fetch currently running for it.
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL") # A lost cache write only costs a miss.
+        self._db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT, expires REAL, used REAL)")
+        self._db.execute("DELETE FROM entries WHERE expires < ?", (time.time(),))
+        self._db.commit()
+
+    # Return the cached value or `default`; expired entries count as misses.
+    def Get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                row = self._db.execute("SELECT value, expires FROM entries WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    entry = (json.loads(row[0]), row[1])
+            if entry is None or entry[1] < now:
+                if entry is not None:
+                    self._Remove(key) # Expired.
+                    self._db.commit()
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self._Remember(key, entry)
+            self._db.execute("UPDATE entries SET used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            return entry[0]
+
+    # Store a value, optionally with its own time to live.
+    def Set(self, key, value, ttl=None):
+        now = time.time()
+        expires = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._Remember(key, (value, expires))
+            self._db.execute("INSERT OR REPLACE INTO entries (key, value, expires, used) VALUES (?, ?, ?, ?)",
+                             (key, json.dumps(value, ensure_ascii=False), expires, now))
+            # Evict the least recently used rows beyond the size cap.
+            self._db.execute("DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                             (self.max_entries,))
+            self._db.commit()
+
+    # Return the cached value, or call fetch() once even if several threads ask for the same key at the same time.
+    # `ttl` may also be a function of the fetched value, e.g. to keep misses for less time.
+    def GetOrFetch(self, key, fetch, ttl=None):
+        missing = object()
+        value = self.Get(key, missing)
+        if value is not missing:
+            return value
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not owner:
+            return future.result() # Raises the fetch error as well.
+
+        try:
+            value = fetch()
+            self.Set(key, value, ttl(value) if callable(ttl) else ttl)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e) # Errors are passed to the waiters but never cached.
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    # Drop a key from both tiers.
+    def Delete(self, key):
+        with self._lock:
+            self._Remove(key)
+            self._db.commit()
+
+    # Hit and miss counters.
+    def Stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced, "hit_rate": self.hits / total if total else 0.0, "entries": len(self._memory)}
+
+    # Put an entry at the most recently used end of the memory tier, evicting the oldest one.
+    def _Remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _Remove(self, key):
+        self._memory.pop(key, None)
+        self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
@@ -0,0 +1,155 @@
+import threading # Import threading to serialize appends from different backends.
+import struct # Import struct to store byte offsets in the index file.
+import json # Import json to encode each turn as one line.
+import sys # Import sys for the command line entry point.
+import os # Import os for file handling and fsync.
+
+# Each index entry is the byte offset of a turn as an unsigned 64-bit little-endian integer.
+OffsetFormat = struct.Struct("<Q")
+
+# Append-only chat log: one JSON line per turn, plus an index of the byte offset of every line.
+class ChatLogStore:
+    def __init__(self, path=os.path.join("Data", "ChatLog.jsonl"), legacy_path=os.path.join("Data", "ChatLog.json")):
+        self.path = path # JSONL file with one turn (a list of messages) per line.
+        self.index_path = os.path.splitext(path)[0] + ".idx" # Offsets of the turns in the JSONL file.
+        self.legacy_path = legacy_path # The old ChatLog.json, imported on first use.
+        self._lock = threading.Lock()
+        self._offsets = [] # Byte offset of every complete turn.
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if not os.path.exists(path):
+            self._ImportLegacy()
+        self._Recover()
+
+    # Convert the old ChatLog.json into turns, starting a new turn at every user message.
+    def _ImportLegacy(self):
+        turns = []
+        try:
+            with open(self.legacy_path, "r", encoding="utf-8") as f:
+                for message in json.load(f):
+                    if message.get("role") == "user" or not turns:
+                        turns.append([])
+                    turns[-1].append(message)
+        except (FileNotFoundError, ValueError):
+            pass
+
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for turn in turns:
+                f.write(json.dumps(turn, ensure_ascii=False) + "\n")
+        os.replace(temp_path, self.path)
+
+    # Load the index and repair it, dropping a torn last line left by a crash during an append.
+    def _Recover(self):
+        size = os.path.getsize(self.path)
+        offsets = []
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f:
+                data = f.read()
+            offsets = [value for (value,) in OffsetFormat.iter_unpack(data[:len(data) - len(data) % OffsetFormat.size])]
+            offsets = [offset for offset in offsets if offset < size]
+
+        # Re-scan everything after the last indexed turn; it is the only part that can be incomplete.
+        start = offsets.pop() if offsets else 0
+        valid_end = start
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            while True:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break # End of file or a torn line without its newline.
+                try:
+                    json.loads(line)
+                except ValueError:
+                    break
+                offsets.append(valid_end)
+                valid_end += len(line)
+
+        if valid_end < size:
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_end)
+
+        self._offsets = offsets
+        with open(self.index_path, "wb") as f:
+            f.write(b"".join(OffsetFormat.pack(offset) for offset in offsets))
+
+    # Atomically append one turn (a list of messages); a crash leaves either the whole turn or none of it.
+    def AppendTurn(self, messages):
+        self.AppendTurns([messages])
+
+    # Append several turns with a single write and fsync; a crash can only tear the last line, which _Recover drops.
+    def AppendTurns(self, turns):
+        lines = [(json.dumps(list(messages), ensure_ascii=False) + "\n").encode("utf-8") for messages in turns]
+        if not lines:
+            return
+        with self._lock:
+            with open(self.path, "ab") as f:
+                offset = f.tell()
+                f.write(b"".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+            offsets = []
+            for line in lines:
+                offsets.append(offset)
+                offset += len(line)
+            with open(self.index_path, "ab") as f:
+                f.write(b"".join(OffsetFormat.pack(value) for value in offsets)) # The index can be rebuilt, so it is not fsynced.
+            self._offsets.extend(offsets)
+
+    # Number of turns stored.
+    def TurnCount(self):
+        with self._lock:
+            return len(self._offsets)
+
+    # Yield the turns in [start, stop) without loading the rest of the file.
+    def IterTurns(self, start=0, stop=None):
+        with self._lock:
+            offsets = self._offsets[start:stop]
+        if not offsets:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(offsets[0])
+            for _ in offsets:
+                yield json.loads(f.readline())
+
+    # Yield the messages of every turn from the given turn onwards.
+    def IterMessages(self, start=0, stop=None):
+        for turn in self.IterTurns(start, stop):
+            yield from turn
+
+    # Return the flat message list from the given turn onwards, like the old ChatLog.json content.
+    def Messages(self, start=0):
+        return list(self.IterMessages(start))
+
+    # Return the messages added after the first `seen` turns together with the new turn count.
+    def MessagesSince(self, seen):
+        count = self.TurnCount()
+        return list(self.IterMessages(seen, count)), count
+
+    # Remove every turn.
+    def Clear(self):
+        with self._lock:
+            for path in (self.path, self.index_path):
+                with open(path, "wb") as f:
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._offsets = []
+
+    # Write the log in the old ChatLog.json format.
+    def ExportJson(self, path=None):
+        path = path or self.legacy_path
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.Messages(), f, indent=4)
+        os.replace(temp_path, path)
+        return path
+
+# Shared chat log used by every backend.
+ChatLog = ChatLogStore()
+
+# Command line entry point: python -m Backend.ChatLogStore export [path]
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "export":
+        print(f"Exported to {ChatLog.ExportJson(sys.argv[2] if len(sys.argv) > 2 else None)}")
+    else:
+        print(f"{ChatLog.TurnCount()} turns in {ChatLog.path}")
@@ -1,21 +1,16 @@
-from groq import Groq # Importing the Groq library to use its API.
-from json import load, dump # Importing functions to read and write JSON files.
+from Backend.Conversation import Conversation # Importing the conversation shared with the other backends.
+from Backend.ContextWindow import ContextWindow # Importing the token-budgeted context manager.
+from Backend.Cache import PersistentCache # Importing the persistent TTL/LRU cache.
+from Backend.Tracing import Trace # Importing the span tracer.
+import os # Importing os for file paths.
+import re # Importing re to normalize queries for the response cache.
 import datetime # Importing the datetime module for real-time date and time information.
-from dotenv import dotenv_values # Importing dotenv_values to read environment variables from a .env file.
-
-# Load environment variables from the .env file.
-env_vars = dotenv_values(".env")
+from Backend.Config import env_vars, GroqClient # Importing the shared settings and the lazily created Groq client.
 
 # Retrieve specific environment variables for username, assistant name, and API key.
 Username = env_vars.get("Username")
 Assistantname = env_vars.get("Assistantname")
-GroqAPIKey = env_vars.get("GroqAPIKey")
-
-# Initialize the Groq client using the provided API key.
-client = Groq(api_key=GroqAPIKey)
-
-# Initialize an empty list to store chat messages.
-messages = []
+ChatContextBudget = int(env_vars.get("ChatContextBudget", 6000)) # Prompt token budget; llama3-70b-8192 also needs room for the 1024-token answer.
 
 # Define a system message that provides context to the AI chatbot about its role and behavior.
 System = f"""Hello, I am {Username}, You are a very accurate and advanced AI chatbot named {Assistantname} which also has real-time up-to-date information from the internet.
@@ -29,14 +24,52 @@ SystemChatBot = [
     {"role": "system", "content": System}
 ]
 
-# Attempt to load the chat log from a JSON file.
-try:
-    with open(r"Data\ChatLog.json", "r") as f:
-        messages = load(f)  # Load existing messages from the chat log.
-except FileNotFoundError:
-    # If the file doesn't exist, create an empty JSON file to store chat logs.
-    with open(r"Data\ChatLog.json", "w") as f:
-        dump([], f)
+# Function to fold older messages into a short summary using a small, fast model.
+def SummarizeHistory(Summary, Messages):
+    Transcript = "\n".join(f"{message['role']}: {message['content']}" for message in Messages)
+    completion = GroqClient().chat.completions.create(
+        model="llama3-8b-8192",
+        messages=[
+            {"role": "system", "content": "Summarize this conversation between a user and an AI assistant in under 200 words. Keep names, facts, preferences and open questions."},
+            {"role": "user", "content": f"Previous summary:\n{Summary or 'None'}\n\nNew messages:\n{Transcript}"}
+        ],
+        max_tokens=400,
+        temperature=0.3
+    )
+    return completion.choices[0].message.content.strip()
+
+# Context manager that keeps recent turns verbatim and folds older ones into a rolling summary.
+Context = ContextWindow(ChatContextBudget, SummarizeHistory)
+
+# Cache of answers to general questions, persisted across restarts.
+ResponseCache = PersistentCache(
+    os.path.join("Data", "ResponseCache.sqlite"),
+    max_entries=int(env_vars.get("ChatCacheSize", 256)),
+    ttl=float(env_vars.get("ChatCacheTTL", 24 * 3600))
+)
+
+# Questions that depend on the current time or on the conversation so far are never answered from the cache.
+TimeSensitive = re.compile(r"\b(time|date|day|today|tonight|tomorrow|yesterday|now|current|currently|latest|recent|this (week|month|year)|year|month|weather|news)\b")
+# Words pointing back into the conversation, and conjunctions that continue it; the speaker's own "me" and "my" do not.
+ContextDependent = re.compile(r"\b(it|its|that|this|these|those|he|she|him|her|his|hers|they|them|their|theirs|"
+                              r"again|earlier|previous|above|more|further|elaborate|continue|example|summarize|same|other)\b|"
+                              r"^(and|but|so|also|then|what about|how about)\b")
+# Whole replies that only make sense after the previous answer.
+FollowUps = re.compile(r"^(why|why not|yes|no|ok|okay|sure|really|go on|how come|and then|what else)$")
+# Greetings and definitions: cached even though they are short or mention the time.
+Greetings = re.compile(rf"^(hello|hi|hey|good (morning|afternoon|evening))( there| {re.escape(str(Assistantname).lower())})?$|^how are you( doing)?( today)?$|^(thank you|thanks)( so much)?$")
+Definitions = re.compile(r"^(define|meaning of|what is the meaning of|what does \S+ mean)\b")
+
+# Function to build the cache key of a query, or None if the answer may depend on the conversation or the time.
+def ResponseCacheKey(Query):
+    Normalized = " ".join(re.sub(r"[^\w\s']", " ", Query.lower()).split())
+    if not Normalized or FollowUps.match(Normalized):
+        return None
+    if Greetings.match(Normalized):
+        return Normalized
+    if ContextDependent.search(Normalized) or (TimeSensitive.search(Normalized) and not Definitions.match(Normalized)):
+        return None
+    return Normalized
 
 # Function to get real-time date and time information.
 def RealtimeInformation():
@@ -63,50 +96,74 @@ def AnswerModifier(Answer):
     modified_answer = '\n'.join(non_empty_lines)  # Join the cleaned lines back together.
     return modified_answer
 
-# Main chatbot function to handle user queries.
-def ChatBot(Query):
-    """This function sends the user's query to the chatbot and returns the AI's response."""
+# Streaming chatbot function that yields the AI's response piece by piece as it is generated.
+def ChatBotStream(Query, Retries=1):
+    """This function sends the user's query to the chatbot and yields the response deltas as they arrive."""
+
+    Answer = "" # Initialize an empty string to store the AI's response.
+    UserMessage = {"role": "user", "content": f"{Query}"}
+    CacheKey = ResponseCacheKey(Query)
+    CachedAnswer = ResponseCache.Get(CacheKey) if CacheKey else None
 
     try:
-        # Append the user's query to the messages list.
-        messages.append({"role": "user", "content": f"{Query}"})
-
-        # Make a request to the Groq API for a response.
-        completion = client.chat.completions.create(
-            model="llama3-70b-8192",
-            messages=SystemChatBot + [{"role": "system", "content": RealtimeInformation()}] + messages,  # Include system instructions and real-time info.
-            max_tokens=1024,  # Limit the maximum tokens in the response.
-            temperature=0.7,  # Adjust response randomness (higher means more random).
-            top_p=1,  # Use nucleus sampling to control diversity.
-            stream=True  # Enable streaming response.
-        )
-
-        # Initialize an empty string to store the AI's response.
-        Answer = ""
-
-        # Process the streamed response chunks.
-        for chunk in completion:
-            if chunk.choices[0].delta.content:
-                Answer += chunk.choices[0].delta.content  # Append the content to the answer.
-
-        Answer = Answer.replace("</s>", "")  # Clean up any unwanted tokens from the response.
-        
-        # Append the chatbot's response to the messages list.
-        messages.append({"role": "assistant", "content": Answer})
-
-        # Save the updated chat log to the JSON file.
-        with open(r"Data\ChatLog.json", "w") as f:
-            dump(messages, f, indent=4)
-
-        # Return the formatted response.
-        return AnswerModifier(Answer)
+        # The shared history, including turns answered by other backends, plus this query; nothing is read from disk.
+        messages = Conversation.Snapshot() + [UserMessage]
+
+        # Answer repeated general questions from the cache; the turn is still added to the history.
+        if CachedAnswer is not None:
+            print(f"Response cache: {ResponseCache.Stats()}")
+            Answer = CachedAnswer
+            yield Answer
+
+        else:
+            # Fit system instructions, real-time info and the history into the token budget; a retry gets half of it.
+            Prompt = Context.Build(
+                SystemChatBot + [{"role": "system", "content": RealtimeInformation()}],
+                messages,
+                budget=ChatContextBudget if Retries > 0 else ChatContextBudget // 2
+            )
+            print(f"Context tokens: {Context.LastUsage}")
+
+            # Make a request to the Groq API for a response.
+            completion = GroqClient().chat.completions.create(
+                model="llama3-70b-8192",
+                messages=Prompt,
+                max_tokens=1024,  # Limit the maximum tokens in the response.
+                temperature=0.7,  # Adjust response randomness (higher means more random).
+                top_p=1,  # Use nucleus sampling to control diversity.
+                stream=True  # Enable streaming response.
+            )
+
+            # Yield the streamed response chunks as soon as they arrive.
+            for chunk in Trace.Stream("llm.chat", completion):
+                Delta = chunk.choices[0].delta.content
+                if Delta:
+                    Delta = Delta.replace("</s>", "")  # Clean up any unwanted tokens from the chunk.
+                    Answer += Delta  # Keep the full answer for the chat log.
+                    yield Delta
 
     except Exception as e:
-        # Handle errors by printing the exception and resetting the chat log.
+        # Handle errors by printing the exception; the chat log is kept since the prompt size is bounded.
         print(f"Error: {e}")
-        with open(r"Data\ChatLog.json", "w") as f:
-            dump([], f, indent=4)
-        return ChatBot(Query)
+        if not Answer and Retries > 0:
+            yield from ChatBotStream(Query, Retries - 1)  # Retry only if nothing has been shown yet.
+        return
+
+    Answer = Answer.replace("</s>", "")  # Clean up any unwanted tokens from the response.
+
+    # Remember freshly generated answers to general questions.
+    if CacheKey and CachedAnswer is None and Answer:
+        ResponseCache.Set(CacheKey, Answer)
+
+    # Add the completed turn to the shared conversation; it is written to the chat log in the background.
+    Conversation.AddTurn([UserMessage, {"role": "assistant", "content": Answer}])
+
+# Main chatbot function to handle user queries.
+def ChatBot(Query):
+    """This function sends the user's query to the chatbot and returns the AI's response."""
+
+    # Collect the streamed response and return it formatted.
+    return AnswerModifier("".join(ChatBotStream(Query)))
 
 # Main program entry point.
 if __name__ == "__main__":
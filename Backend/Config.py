@@ -0,0 +1,47 @@
+from dotenv import dotenv_values # Import dotenv to read the .env file.
+import threading # Import threading to create each client only once.
+
+# Settings from the .env file, parsed once and shared by every module.
+env_vars = dotenv_values(".env")
+
+# API clients are created on first use so importing a module never builds one.
+_lock = threading.Lock()
+_clients = {}
+
+# Return the named client, creating it with create() the first time.
+def _Client(name, create):
+    with _lock:
+        if name not in _clients:
+            _clients[name] = create()
+        return _clients[name]
+
+# Replace a client, e.g. with a local stand-in for benchmarks; None goes back to the real one.
+def UseClient(name, client):
+    with _lock:
+        if client is None:
+            _clients.pop(name, None)
+        else:
+            _clients[name] = client
+
+# Shared Groq client; the groq package itself is imported here, on first use.
+def GroqClient():
+    def Create():
+        from groq import Groq
+        return Groq(api_key=env_vars.get("GroqAPIKey"))
+    return _Client("groq", Create)
+
+# Shared Cohere client; the cohere package itself is imported here, on first use.
+def CohereClient():
+    def Create():
+        import cohere
+        return cohere.Client(api_key=env_vars.get("CohereAPIKey"))
+    return _Client("cohere", Create)
+
+# Shared HTTP session for plain web requests, so connections are reused between calls.
+def WebSession():
+    def Create():
+        import requests
+        session = requests.Session()
+        session.headers["User-Agent"] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.75 Safari/537.36'
+        return session
+    return _Client("web", Create)
@@ -0,0 +1,82 @@
+import threading # Import threading to refresh the summary in the background.
+
+# Estimate the number of tokens of a text; roughly four characters per token for English.
+def CountTokens(text):
+    return len(str(text)) // 4 + 1
+
+# Estimate the tokens of a chat message, including a small per-message overhead.
+def MessageTokens(message):
+    return CountTokens(message["content"]) + 4
+
+# Keeps a chat prompt under a token budget: recent turns verbatim, older turns folded into a summary.
+class ContextWindow:
+    def __init__(self, budget, summarize):
+        self.budget = budget # Maximum prompt tokens, system messages included.
+        self.summarize = summarize # summarize(previous_summary, messages) -> new summary text.
+        self.summary = "" # Rolling summary of the folded turns.
+        self.summarized_upto = 0 # Number of history messages covered by the summary.
+        self.LastUsage = {} # Token breakdown of the last built prompt.
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    # Build the message list to send: system messages, the summary and as many recent messages as fit.
+    def Build(self, system, history, budget=None):
+        budget = budget or self.budget
+        with self._lock:
+            if self.summarized_upto > len(history):
+                self.summary, self.summarized_upto = "", 0 # The history was cleared.
+            summary, summarized_upto = self.summary, self.summarized_upto
+
+        summary_messages = [{"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"}] if summary else []
+        system_tokens = sum(MessageTokens(message) for message in system)
+        summary_tokens = sum(MessageTokens(message) for message in summary_messages)
+        remaining = budget - system_tokens - summary_tokens
+
+        # Walk back from the newest message; the newest one is always kept.
+        history_tokens = 0
+        cut = len(history)
+        while cut > 0:
+            tokens = MessageTokens(history[cut - 1])
+            if cut < len(history) and history_tokens + tokens > remaining:
+                break
+            history_tokens += tokens
+            cut -= 1
+
+        # Start the verbatim part on a user message so turns are not split.
+        while cut < len(history) - 1 and history[cut]["role"] != "user":
+            history_tokens -= MessageTokens(history[cut])
+            cut += 1
+
+        if cut > summarized_upto:
+            self._Refresh(summary, history[summarized_upto:cut], cut)
+
+        self.LastUsage = {
+            "system": system_tokens,
+            "summary": summary_tokens,
+            "history": history_tokens,
+            "total": system_tokens + summary_tokens + history_tokens,
+            "messages_kept": len(history) - cut,
+            "messages_folded": summarized_upto,
+        }
+        return system + summary_messages + history[cut:]
+
+    # Fold the given messages into the summary on a background thread.
+    def _Refresh(self, summary, messages, upto):
+        with self._lock:
+            if self._refreshing:
+                return # A refresh is already running; the next Build will catch up.
+            self._refreshing = True
+
+        def Worker():
+            try:
+                new_summary = self.summarize(summary, messages)
+                with self._lock:
+                    if upto > self.summarized_upto:
+                        self.summary, self.summarized_upto = new_summary, upto
+            except Exception as e:
+                print(f"Error refreshing chat summary: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=Worker, daemon=True).start()
@@ -0,0 +1,78 @@
+from Backend.ChatLogStore import ChatLog # Import the append-only chat log used for persistence.
+import threading # Import threading to guard the history and run the writer.
+import atexit # Import atexit to write pending turns on shutdown.
+
+# The conversation shared by every backend: kept in memory, persisted to the chat log behind the turn.
+class ConversationStore:
+    def __init__(self, log, flush_interval=1.0):
+        self.log = log
+        self.flush_interval = flush_interval # Seconds the writer waits to batch turns together.
+        self._condition = threading.Condition()
+        self._messages = None # Read from the log on first use, so importing this module never parses it.
+        self._turns = 0
+        self._pending = [] # Turns added but not yet written.
+        self._writing = False
+        self._writer = None
+
+    # Read the history from the log once; the warm-up calls this so the first turn does not wait for it.
+    def Load(self):
+        with self._condition:
+            self._Loaded()
+
+    # The history, reading it first if needed; the only read of the log, turns never touch the disk afterwards.
+    def _Loaded(self):
+        if self._messages is None:
+            self._messages = self.log.Messages()
+            self._turns = self.log.TurnCount()
+        return self._messages
+
+    # Copy of the whole history, safe to use while other turns are being added.
+    def Snapshot(self):
+        with self._condition:
+            return list(self._Loaded())
+
+    def TurnCount(self):
+        with self._condition:
+            self._Loaded()
+            return self._turns
+
+    # Add a completed turn (user message and answer); it is visible at once and written in the background.
+    def AddTurn(self, messages):
+        turn = list(messages)
+        with self._condition:
+            self._Loaded().extend(turn)
+            self._turns += 1
+            self._pending.append(turn)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._Write, name="ConversationWriter", daemon=True)
+                self._writer.start()
+            self._condition.notify_all()
+
+    # Writer loop: wait a little so turns arriving together are written with one fsync.
+    def _Write(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending)
+                self._condition.wait(self.flush_interval)
+                batch, self._pending = self._pending, []
+                self._writing = True
+            try:
+                self.log.AppendTurns(batch)
+            except Exception as e:
+                print(f"Error writing the chat log: {e}")
+                with self._condition:
+                    self._pending[:0] = batch # Keep the turns and try again with the next batch.
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._condition.notify_all()
+
+    # Block until every added turn is on disk, e.g. before exiting; returns False on timeout.
+    def Flush(self, timeout=5.0):
+        with self._condition:
+            self._condition.notify_all()
+            return self._condition.wait_for(lambda: not self._pending and not self._writing, timeout)
+
+# Conversation shared by the chatbot and the realtime search engine.
+Conversation = ConversationStore(ChatLog)
+atexit.register(Conversation.Flush)
@@ -0,0 +1,100 @@
+import threading # Import threading for locks and condition variables.
+import os # Import os for file path handling.
+
+# Define the topics carried by the bus together with the type of value each one accepts.
+Topics = {
+    "Status": str,     # Assistant status line shown under the animation.
+    "Mic": str,        # Microphone state, "True" while listening is enabled.
+    "Responses": str,  # Latest text shown on the chat screen.
+    "StreamStart": str, # Prefix of a message whose body is about to be streamed.
+    "StreamDelta": str, # Next piece of the message being streamed.
+    "StreamEnd": str,   # Complete text of the streamed message.
+    "ImageStatus": str, # Progress of the image generation worker.
+}
+
+# In-process publish/subscribe bus that replaces the Frontend/Files/*.data polling.
+class EventBus:
+    def __init__(self):
+        self._lock = threading.Lock() # Guards the state and the subscriber lists.
+        self._changed = threading.Condition(self._lock) # Wakes up threads waiting for a value.
+        self._state = {} # Last published value of every topic.
+        self._subscribers = {topic: [] for topic in Topics} # Callbacks registered per topic.
+        self._sinks = [] # Extra consumers that receive every event, e.g. the file mirror.
+
+    # Check that the topic exists and the value has the declared type.
+    def _Validate(self, topic, value):
+        if topic not in Topics:
+            raise KeyError(f"Unknown topic: {topic}")
+        if not isinstance(value, Topics[topic]):
+            raise TypeError(f"Topic {topic} expects {Topics[topic].__name__}, got {type(value).__name__}")
+
+    # Register a callback that is called with every new value of the topic.
+    def Subscribe(self, topic, callback):
+        if topic not in Topics:
+            raise KeyError(f"Unknown topic: {topic}")
+        with self._lock:
+            self._subscribers[topic].append(callback)
+        return callback
+
+    # Remove a callback registered with Subscribe.
+    def Unsubscribe(self, topic, callback):
+        with self._lock:
+            if callback in self._subscribers[topic]:
+                self._subscribers[topic].remove(callback)
+
+    # Register a sink that is called as sink(topic, value) for every delivered event.
+    def AddSink(self, sink):
+        with self._lock:
+            self._sinks.append(sink)
+
+    # Publish a value; subscribers are only notified when it differs from the previous one.
+    def Publish(self, topic, value, force=False):
+        self._Validate(topic, value)
+        with self._lock:
+            if not force and topic in self._state and self._state[topic] == value:
+                return False # Nothing changed, nothing to repaint.
+            self._state[topic] = value
+            callbacks = list(self._subscribers[topic])
+            sinks = list(self._sinks)
+            self._changed.notify_all() # Wake up WaitFor callers.
+
+        # Deliver outside the lock so slow consumers cannot block publishers.
+        for callback in callbacks:
+            try:
+                callback(value)
+            except Exception as e:
+                print(f"EventBus subscriber error on {topic}: {e}")
+        for sink in sinks:
+            try:
+                sink(topic, value)
+            except Exception as e:
+                print(f"EventBus sink error on {topic}: {e}")
+        return True
+
+    # Return the last published value of a topic.
+    def Get(self, topic, default=""):
+        with self._lock:
+            return self._state.get(topic, default)
+
+    # Block until the topic holds the given value; returns False on timeout.
+    def WaitFor(self, topic, value, timeout=None):
+        with self._changed:
+            return self._changed.wait_for(lambda: self._state.get(topic) == value, timeout=timeout)
+
+# Debugging sink that mirrors every event into <directory>/<topic>.data like the old file IPC.
+class FileMirrorSink:
+    def __init__(self, directory, topics=("Status", "Mic", "Responses")):
+        self.directory = directory
+        self.topics = set(topics) # Only the topics that used to have a .data file are mirrored.
+        os.makedirs(directory, exist_ok=True)
+
+    def __call__(self, topic, value):
+        if topic == "StreamEnd":
+            topic = "Responses" # A finished stream is what used to be written to Responses.data.
+        if topic not in self.topics:
+            return
+        with open(os.path.join(self.directory, f"{topic}.data"), "w", encoding='utf-8') as file:
+            file.write(value)
+
+# Process-wide bus shared by the GUI and the backend thread.
+Bus = EventBus()
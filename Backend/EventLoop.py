@@ -0,0 +1,37 @@
+import asyncio # Import asyncio for the shared event loop.
+import threading # Import threading to run the loop in the background.
+
+# One asyncio event loop running for the whole life of the application on its own thread.
+class BackgroundLoop:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+
+    # Start the loop thread on first use and return the loop.
+    def Get(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="BackendLoop", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    # Schedule a coroutine on the loop and return a concurrent.futures.Future for its result.
+    def Submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.Get())
+
+    # Run a coroutine on the loop and wait for its result; replaces asyncio.run() in blocking code.
+    def Run(self, coro, timeout=None):
+        loop = self.Get()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("Run() would deadlock when called from the loop thread; await the coroutine instead.")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+# Shared loop used by every backend module.
+Loop = BackgroundLoop()
+
+# Function to run a coroutine to completion on the shared loop.
+def RunAsync(coro, timeout=None):
+    return Loop.Run(coro, timeout)
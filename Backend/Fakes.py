@@ -0,0 +1,224 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer # Import the HTTP server for the fake image endpoint.
+from types import SimpleNamespace # Import SimpleNamespace to mimic SDK response objects.
+from PIL import Image # Import PIL to produce real JPEG bytes.
+import threading # Import threading to run the fake server and guard the counters.
+import asyncio # Import asyncio for the fake edge_tts.
+import random # Import random for latency jitter and injected errors.
+import json # Import json for the fake server's error body.
+import time # Import time for the simulated latency.
+import io # Import io to encode images in memory.
+
+# Local stand-ins for every external service, used by the benchmark to run turns without a network.
+# Every service takes a latency, a jitter and an error rate; `time_scale` multiplies all waiting (0 = no waiting).
+
+# Error raised by a fake service when an error is injected.
+class FakeServiceError(Exception):
+    pass
+
+# Words the fake models build their answers from.
+AnswerWords = """the a of to and in is that it for on with as was at by this from be are or an have has which
+answer system result model data time people world first new year work part place case point group number fact""".split()
+
+# Base of the fakes: simulated latency, injected errors and call counters.
+class FakeService:
+    def __init__(self, name, latency=0.0, jitter=0.0, error_rate=0.0, time_scale=1.0, seed=None, **options):
+        self.name = name
+        self.latency = latency # Seconds before the first byte.
+        self.jitter = jitter # Latency varies uniformly by up to this much either way.
+        self.error_rate = error_rate # Fraction of calls that fail.
+        self.time_scale = time_scale
+        self.options = options # Service-specific settings such as the chunk cadence.
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    # Seconds to wait for a value configured in the profile, scaled by the time scale.
+    def Scaled(self, seconds):
+        return max(0.0, seconds) * self.time_scale
+
+    # Account for a call, returning its latency and whether it should fail.
+    def _Begin(self):
+        with self._lock:
+            self.calls += 1
+            fail = self.rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+            delay = self.Scaled(self.latency + self.rng.uniform(-self.jitter, self.jitter))
+        return delay, fail
+
+    # Wait for the latency, then fail if an error was injected.
+    def Call(self):
+        delay, fail = self._Begin()
+        time.sleep(delay)
+        if fail:
+            raise FakeServiceError(f"{self.name}: injected error")
+
+    async def CallAsync(self):
+        delay, fail = self._Begin()
+        await asyncio.sleep(delay)
+        if fail:
+            raise FakeServiceError(f"{self.name}: injected error")
+
+    def Stats(self):
+        with self._lock:
+            return {"calls": self.calls, "errors": self.errors}
+
+# Groq chat completions, streamed in chunks at a configurable cadence.
+# Options: words (answer length), chunk_words (words per chunk), chunk_interval (seconds between chunks).
+class FakeGroq(FakeService):
+    def __init__(self, **settings):
+        super().__init__("groq", **settings)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.Create))
+
+    # Build an answer of `words` words, in sentences of about twelve words.
+    def Answer(self):
+        words = []
+        for i in range(int(self.options.get("words", 60))):
+            with self._lock:
+                word = self.rng.choice(AnswerWords)
+            words.append(word.capitalize() if i % 12 == 0 else word)
+            if i % 12 == 11:
+                words[-1] += "."
+        return " ".join(words).rstrip(".") + "."
+
+    def Create(self, model=None, messages=None, stream=False, **kwargs):
+        self.Call() # Time to first token; errors happen before anything is streamed, like a failed request.
+        answer = self.Answer()
+        if not stream:
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=answer))])
+        return self._Stream(answer)
+
+    def _Stream(self, answer):
+        words = answer.split(" ")
+        size = max(1, int(self.options.get("chunk_words", 1)))
+        interval = self.Scaled(float(self.options.get("chunk_interval", 0.02)))
+        for i in range(0, len(words), size):
+            if i:
+                time.sleep(interval)
+            text = (" " if i else "") + " ".join(words[i:i + size])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+# Cohere decision model; realtime-looking questions are classified "realtime", everything else "general".
+class FakeCohere(FakeService):
+    RealtimeWords = ("news", "weather", "today", "latest", "price", "score", "who is", "current")
+
+    def __init__(self, **settings):
+        super().__init__("cohere", **settings)
+
+    def chat_stream(self, message="", **kwargs):
+        self.Call()
+        query = message.lower().rstrip(".?!")
+        kind = "realtime" if any(word in query for word in self.RealtimeWords) else "general"
+        decision = f"{kind} {query}"
+        for i in range(0, len(decision), 8):
+            yield SimpleNamespace(event_type="text-generation", text=decision[i:i + 8])
+
+# googlesearch.search with advanced results.
+class FakeSearch(FakeService):
+    def __init__(self, **settings):
+        super().__init__("search", **settings)
+
+    def __call__(self, query, advanced=True, num_results=5, **kwargs):
+        self.Call()
+        return [SimpleNamespace(title=f"Result {i + 1} for {query}", description=f"A short description of result {i + 1} about {query}.")
+                for i in range(num_results)]
+
+# edge_tts module: Communicate(...).save() writes the text itself, which FakePlayer uses to time playback.
+class FakeEdgeTTS(FakeService):
+    def __init__(self, **settings):
+        super().__init__("tts", **settings)
+        service = self
+
+        class Communicate:
+            def __init__(self, text, voice=None, pitch=None, rate=None):
+                self.text = text
+
+            async def save(self, file_path):
+                await service.CallAsync()
+                with open(file_path, "w", encoding="utf-8") as f:
+                    f.write(self.text)
+
+        self.Communicate = Communicate
+
+# Audio player that takes as long as the text would take to speak. Option: words_per_second.
+class FakePlayer(FakeService):
+    def __init__(self, **settings):
+        super().__init__("playback", **settings)
+
+    def Play(self, file_path, func=lambda r=None: True):
+        self.Call()
+        with open(file_path, "r", encoding="utf-8") as f:
+            words = len(f.read().split())
+        end = time.perf_counter() + self.Scaled(words / float(self.options.get("words_per_second", 2.5)))
+        while time.perf_counter() < end:
+            if func() == False:
+                return False
+            time.sleep(min(0.1, max(0.0, end - time.perf_counter())))
+        return True
+
+    def Warm(self):
+        pass
+
+    def Close(self):
+        pass
+
+# mtranslate.translate; returns the text unchanged.
+class FakeTranslate(FakeService):
+    def __init__(self, **settings):
+        super().__init__("translate", **settings)
+
+    def __call__(self, text, *args):
+        self.Call()
+        return text
+
+# Automation(commands); opening apps and searches only take time.
+class FakeAutomation(FakeService):
+    def __init__(self, **settings):
+        super().__init__("automation", **settings)
+
+    async def __call__(self, commands):
+        for _ in commands:
+            await self.CallAsync()
+        return True
+
+# Hugging Face inference endpoint on localhost: POST returns a small JPEG, injected errors return 503 with estimated_time.
+class FakeImageServer(FakeService):
+    def __init__(self, **settings):
+        super().__init__("images", **settings)
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                delay, fail = service._Begin()
+                time.sleep(delay)
+                if fail:
+                    body = json.dumps({"error": "Model is loading", "estimated_time": service.Scaled(1.0)}).encode("utf-8")
+                    self.send_response(503)
+                    self.send_header("Content-Type", "application/json")
+                else:
+                    body = service.Image()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass # Keep the benchmark output readable.
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        threading.Thread(target=self.server.serve_forever, name="FakeImageServer", daemon=True).start()
+
+    # A small image of a random colour, so every image has different bytes.
+    def Image(self):
+        with self._lock:
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+        buffer = io.BytesIO()
+        Image.new("RGB", (64, 64), color).save(buffer, "JPEG")
+        return buffer.getvalue()
+
+    def Close(self):
+        self.server.shutdown()
@@ -1,104 +1,249 @@
 import asyncio
 from random import randint
 from PIL import Image
-import requests
-from dotenv import get_key
+import aiohttp
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from concurrent.futures import Future
+from Backend.Config import env_vars
+from Backend.EventLoop import RunAsync
+from Backend.EventBus import Bus
+from Backend.ImageStore import ImageStore
+import threading
+import queue
 import os
 from time import sleep
 
 # Ensure the Data directory exists
 os.makedirs("Data", exist_ok=True)
 
-# Function to open and display images based on a given prompt
-def open_images(prompt):
-    folder_path = r"Data"  # Folder where the images are stored
-    prompt = prompt.replace(" ", "_")  # Replace spaces in prompt with underscores
+# API details for the Hugging Face Stable Diffusion model
+API_URL = "https://api-inference.huggingface.co/models/stabilityai/stable-diffusion-xl-base-1.0"
+headers = {"Authorization": f"Bearer {env_vars.get('HuggingFaceAPIKey')}"}
+
+# Settings for progressive fetching
+ImagesEnough = int(env_vars.get("ImagesEnough", 2))  # Once this many images are in, slow requests get a deadline
+ImageStragglerTimeout = float(env_vars.get("ImageStragglerTimeout", 15))  # Seconds the remaining requests may still take
+MaxRetryWait = 60  # Upper bound for any server-suggested wait
+ReuseGeneratedImages = str(env_vars.get("ReuseGeneratedImages", "False")).lower() == "true"  # Show the stored set for a repeated prompt
+
+# Parameters that, together with the prompt, identify a set of generated images
+ImageSuffix = "High quality, sharp focus, high resolution."
+ImageParams = {"model": API_URL, "suffix": ImageSuffix, "count": 4}
+
+# Content-addressed store for the generated images, with thumbnails and a metadata index
+Store = ImageStore(max_images=int(env_vars.get("ImageStoreSize", 400)))
 
-    # Generate the filenames for the images
-    files = [f"{prompt}_Hi{i + 1}.jpg" for i in range(4)]
-    for jpg_file in files:
-        image_path = os.path.join(folder_path, jpg_file)
+# Shared HTTP session with keep-alive, created on the shared event loop and reused by every request
+session = None
+
+async def get_session():
+    global session
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=8, keepalive_timeout=90),
+            timeout=aiohttp.ClientTimeout(total=180, connect=10)
+        )
+    return session
+
+# Work out how long to wait before retrying, from Retry-After or the 503 "model loading" estimate
+def retry_delay(status, response_headers, body, attempt):
+    retry_after = response_headers.get("Retry-After")
+    if retry_after:
         try:
-            # Try to open and display the image
-            img = Image.open(image_path)
-            print(f"Opening image: {image_path}")
-            img.show()
-            sleep(1)
-        except IOError:
-            print(f"Unable to open {image_path}")
+            return min(float(retry_after), MaxRetryWait)
+        except ValueError:
+            try:
+                when = parsedate_to_datetime(retry_after)
+                return min(max((when - datetime.now(timezone.utc)).total_seconds(), 0), MaxRetryWait)
+            except (TypeError, ValueError):
+                pass
+    if status == 503 and isinstance(body, dict) and "estimated_time" in body:
+        return min(float(body["estimated_time"]), MaxRetryWait)
+    return min(2 * 2 ** attempt, MaxRetryWait)  # Exponential backoff otherwise
 
-# API details for the Hugging Face Stable Diffusion model
-API_URL = "https://api-inference.huggingface.co/models/stabilityai/stable-diffusion-xl-base-1.0"
-headers = {"Authorization": f"Bearer {get_key('.env', 'HuggingFaceAPIKey')}"}
 # Async function to send a query to the Hugging Face API with retry mechanism
 async def query_with_retry(payload, retries=3):
     for attempt in range(retries):
+        delay = retry_delay(None, {}, None, attempt)
         try:
-            response = await asyncio.to_thread(requests.post, API_URL, headers=headers, json=payload)
-            print(f"Response Status: {response.status_code}")
-            if response.status_code == 200:
-                print(f"Data size: {len(response.content)} bytes")
-                if len(response.content) > 0:
-                    return response.content
-            else:
-                print(f"Attempt {attempt + 1} failed: {response.status_code} - {response.text}")
+            client = await get_session()
+            async with client.post(API_URL, headers=headers, json=payload) as response:
+                content = await response.read()
+                print(f"Response Status: {response.status}")
+                if response.status == 200:
+                    print(f"Data size: {len(content)} bytes")
+                    if len(content) > 0:
+                        return content
+                else:
+                    try:
+                        body = await response.json(content_type=None)
+                    except ValueError:
+                        body = None
+                    delay = retry_delay(response.status, response.headers, body, attempt)
+                    print(f"Attempt {attempt + 1} failed: {response.status} - {content[:200]!r}")
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             print(f"API Error: {e}")
-        await asyncio.sleep(2)
+        if attempt < retries - 1:
+            await asyncio.sleep(delay)
     return None
 
-# Async function to generate images based on the given prompt
-async def generate_images(prompt: str):
-    tasks = []
+# Async function to generate images; each image is saved and passed to on_image as soon as it arrives
+async def generate_images(prompt: str, on_image=None):
+    loop = asyncio.get_running_loop()
+    payload = {
+        "inputs": f"{prompt}. {ImageSuffix}"
+    }
+    key, generation = await asyncio.to_thread(Store.NewGeneration, prompt, ImageParams)
     # Create 4 image generation tasks
-    for _ in range(4):
-        payload = {
-            "inputs": f"{prompt}. High quality, sharp focus, high resolution."
-        }
-        task = asyncio.create_task(query_with_retry(payload))
-        tasks.append(task)
-
-    # Wait for all tasks to complete
-    image_bytes_list = await asyncio.gather(*tasks)
-
-    # Save the generated images to files
-    for i, image_bytes in enumerate(image_bytes_list):
-        if image_bytes:
-            file_name = fr"Data\{prompt.replace(' ', '_')}_Hi{i + 1}.jpg"
+    tasks = {asyncio.create_task(query_with_retry(payload)): i for i in range(ImageParams["count"])}
+    pending = set(tasks)
+    saved = []
+    shown = [] # Futures of the on_image calls, awaited before returning.
+    deadline = None
+
+    try:
+        while pending:
+            timeout = None if deadline is None else max(deadline - loop.time(), 0)
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                print(f"Cancelling {len(pending)} slow image requests")
+                break
+
+            # Save the generated images to files as they complete
+            for task in done:
+                i = tasks[task]
+                image_bytes = task.result()
+                if not image_bytes:
+                    print(f"No data for image {i + 1} of '{prompt}'")
+                    continue
+                try:
+                    file_name = await asyncio.to_thread(Store.SaveImage, key, generation, image_bytes)
+                    print(f"Saved {file_name}")
+                    saved.append(file_name)
+                    if on_image:
+                        shown.append(loop.run_in_executor(None, on_image, file_name))  # Show it without waiting for the others
+                except Exception as e:
+                    print(f"Failed to save image {i + 1} of '{prompt}': {e}")
+
+            if deadline is None and len(saved) >= ImagesEnough:
+                deadline = loop.time() + ImageStragglerTimeout
+    finally:
+        for task in pending:
+            task.cancel()
+        # The job is only done once every image has been shown; their errors are reported, not lost.
+        for result in await asyncio.gather(*shown, return_exceptions=True):
+            if isinstance(result, Exception):
+                print(f"Failed to show an image of '{prompt}': {result}")
+
+    return saved
+
+# Function to open and display one image
+def show_image(image_path):
+    try:
+        print(f"Opening image: {image_path}")
+        Image.open(image_path).show()
+    except IOError:
+        print(f"Unable to open {image_path}")
+
+# Wrapper function to generate and open images
+def GenerateImages(prompt: str, on_image=show_image, reuse=None):
+    # A repeated prompt can be answered from the stored set without calling the API
+    if ReuseGeneratedImages if reuse is None else reuse:
+        stored = Store.Find(prompt, ImageParams)
+        if stored:
+            for image_path in stored:
+                on_image(image_path)
+            return stored
+    return RunAsync(generate_images(prompt, on_image))  # Images are opened as soon as each one is saved
+
+# A single image generation request and its outcome.
+class ImageJob:
+    def __init__(self, prompt, reuse=None):
+        self.prompt = prompt
+        self.reuse = reuse  # Whether a stored set may be shown instead of generating; None uses ReuseGeneratedImages
+        self.key = " ".join(prompt.lower().split())  # Prompts that only differ in case or spacing are the same job
+        self.status = "queued"
+        self.images = []  # Paths of the images saved so far
+        self.future = Future()  # Resolves when the images are saved and opened
+
+# Long-running worker that takes image jobs from a queue, so no interpreter is started per request.
+class ImageWorker:
+    def __init__(self, concurrency=1):
+        self.concurrency = concurrency  # Number of jobs generated at the same time
+        self.jobs = queue.Queue()
+        self.active = {}  # Queued or running jobs by key, used to coalesce duplicate prompts
+        self.lock = threading.Lock()
+        self.threads = []
+
+    # Queue a prompt; a duplicate of a queued or running prompt returns the existing job.
+    def Submit(self, prompt, reuse=None):
+        job = ImageJob(prompt, reuse)
+        with self.lock:
+            if job.key in self.active:
+                return self.active[job.key]
+            self.active[job.key] = job
+            while len(self.threads) < self.concurrency:  # Start the worker threads on first use
+                thread = threading.Thread(target=self._Run, name="ImageWorker", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+        self._Report(job, "queued")
+        self.jobs.put(job)
+        return job
+
+    # Publish the status of a job for the GUI.
+    def _Report(self, job, status):
+        job.status = status
+        Bus.Publish("ImageStatus", f"Images for '{job.prompt}': {status}", force=True)
+
+    # Worker loop: generate one job at a time.
+    def _Run(self):
+        for job in iter(self.jobs.get, None):
+            self._Report(job, "generating")
+
+            def OnImage(image_path, job=job):
+                show_image(image_path)
+                job.images.append(image_path)
+                self._Report(job, f"{len(job.images)} ready")
+
             try:
-                with open(file_name, "wb") as f:
-                    f.write(image_bytes)
-                print(f"Saved {file_name}")
+                saved = GenerateImages(job.prompt, on_image=OnImage, reuse=job.reuse)
+                self._Report(job, "done" if saved else "no images returned")
+                job.future.set_result(saved)
             except Exception as e:
-                print(f"Failed to save {file_name}: {e}")
-        else:
-            print(f"No data for {prompt.replace(' ', '_')}_Hi{i + 1}.jpg")
+                print(f"Image generation error: {e}")
+                self._Report(job, "failed")
+                job.future.set_exception(e)
+            finally:
+                with self.lock:
+                    self.active.pop(job.key, None)
 
-# Wrapper function to generate and open images
-def GenerateImages(prompt: str):
-    asyncio.run(generate_images(prompt))  # Run the async image generation
-    open_images(prompt)  # Open the generated images
+# Shared worker used by MainExecution.
+Worker = ImageWorker(concurrency=int(env_vars.get("ImageWorkers", 1)))
 
-# Main loop to monitor for image generation requests
-while True:
-    try:
-        # Read the status and prompt from the data file
-        with open(r"Frontend\Files\ImageGeneration.data", "r") as f:
-            data = f.read()
-
-        prompt, status = data.split(",")
-
-        # If the status indicates an image generation request
-        if status.strip() == "True":
-            print("Generating Images ...")
-            GenerateImages(prompt=prompt.strip())
-
-            # Reset the status in the file after generating images
-            with open(r"Frontend\Files\ImageGeneration.data", "w") as f:
-                f.write("False, False")
-            break  # Exit the loop after processing the request
-        else:
+# Standalone mode (python -m Backend.ImageGeneration): monitor the data file for image generation requests
+if __name__ == "__main__":
+    while True:
+        try:
+            # Read the status and prompt from the data file
+            with open(r"Frontend\Files\ImageGeneration.data", "r") as f:
+                data = f.read()
+
+            prompt, status = data.split(",")
+
+            # If the status indicates an image generation request
+            if status.strip() == "True":
+                print("Generating Images ...")
+                GenerateImages(prompt=prompt.strip())
+
+                # Reset the status in the file after generating images
+                with open(r"Frontend\Files\ImageGeneration.data", "w") as f:
+                    f.write("False, False")
+                break  # Exit the loop after processing the request
+            else:
+                sleep(1)
+        except Exception as e:
+            print(f"Main Loop Error: {e}")
             sleep(1)
-    except Exception as e:
-        print(f"Main Loop Error: {e}")
-        sleep(1)
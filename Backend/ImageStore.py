@@ -0,0 +1,112 @@
+from concurrent.futures import ThreadPoolExecutor # Import a thread pool for background thumbnailing.
+from PIL import Image # Import PIL to create thumbnails.
+import threading # Import threading to guard the index.
+import hashlib # Import hashlib for content-addressed names.
+import sqlite3 # Import sqlite3 for the metadata index.
+import json # Import json to hash generation parameters deterministically.
+import time # Import time for creation and last-use timestamps.
+import os # Import os for file handling.
+
+# Store of generated images: sets keyed by prompt and parameters, files named by the hash of their bytes.
+class ImageStore:
+    def __init__(self, root=os.path.join("Data", "Images"), max_images=400, thumbnail_size=(256, 256)):
+        self.root = root # Folder holding one sub-folder per prompt/parameter set.
+        self.max_images = max_images # Oldest images beyond this count are deleted.
+        self.thumbnail_size = thumbnail_size
+        self._lock = threading.Lock()
+        self._thumbnailer = ThreadPoolExecutor(max_workers=2, thread_name_prefix="Thumbnail")
+
+        os.makedirs(root, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS sets (key TEXT PRIMARY KEY, prompt TEXT, params TEXT, created REAL, used REAL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS images (path TEXT PRIMARY KEY, set_key TEXT, generation INTEGER, created REAL, thumbnail TEXT)")
+        self._db.commit()
+
+    # Key of a prompt/parameter set; prompts differing only in case or spacing share a key.
+    def Key(self, prompt, params):
+        normalized = " ".join(prompt.lower().split())
+        return hashlib.sha256(json.dumps([normalized, params], sort_keys=True).encode("utf-8")).hexdigest()
+
+    # Register a new generation for the prompt and return (key, generation number).
+    def NewGeneration(self, prompt, params):
+        key = self.Key(prompt, params)
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR IGNORE INTO sets (key, prompt, params, created, used) VALUES (?, ?, ?, ?, ?)",
+                             (key, prompt, json.dumps(params, sort_keys=True), now, now))
+            self._db.execute("UPDATE sets SET used = ? WHERE key = ?", (now, key))
+            row = self._db.execute("SELECT COALESCE(MAX(generation), 0) FROM images WHERE set_key = ?", (key,)).fetchone()
+            self._db.commit()
+        return key, row[0] + 1
+
+    # Save one image of a generation and queue its thumbnail; identical bytes are stored once.
+    def SaveImage(self, key, generation, data):
+        folder = os.path.join(self.root, key[:2], key)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, hashlib.sha256(data).hexdigest()[:32] + ".jpg")
+        if not os.path.exists(path):
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO images (path, set_key, generation, created, thumbnail) VALUES (?, ?, ?, ?, NULL)",
+                             (path, key, generation, time.time()))
+            self._db.commit()
+        self._thumbnailer.submit(self._Thumbnail, path)
+        self._Prune()
+        return path
+
+    # Create a downscaled thumbnail next to the image so galleries never decode full-size files.
+    def _Thumbnail(self, path):
+        try:
+            thumbnail_path = os.path.splitext(path)[0] + "_thumb.jpg"
+            with Image.open(path) as image:
+                image.thumbnail(self.thumbnail_size)
+                image.convert("RGB").save(thumbnail_path, "JPEG", quality=85)
+            with self._lock:
+                self._db.execute("UPDATE images SET thumbnail = ? WHERE path = ?", (thumbnail_path, path))
+                self._db.commit()
+        except Exception as e:
+            print(f"Thumbnail error for {path}: {e}")
+
+    # Return the images of the latest generation for the prompt, or None if there are none on disk.
+    def Find(self, prompt, params):
+        key = self.Key(prompt, params)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path FROM images WHERE set_key = ? AND generation = (SELECT MAX(generation) FROM images WHERE set_key = ?) ORDER BY created",
+                (key, key)).fetchall()
+            if rows:
+                self._db.execute("UPDATE sets SET used = ? WHERE key = ?", (time.time(), key))
+                self._db.commit()
+        paths = [path for (path,) in rows if os.path.exists(path)]
+        return paths or None
+
+    # Recent image sets for a gallery view, newest first, with thumbnail paths where they are ready.
+    def Gallery(self, limit=20):
+        with self._lock:
+            sets = self._db.execute("SELECT key, prompt FROM sets ORDER BY used DESC LIMIT ?", (limit,)).fetchall()
+            gallery = []
+            for key, prompt in sets:
+                images = self._db.execute("SELECT path, thumbnail FROM images WHERE set_key = ? ORDER BY generation DESC, created", (key,)).fetchall()
+                if images:
+                    gallery.append({"prompt": prompt, "images": [path for path, _ in images], "thumbnails": [thumb or path for path, thumb in images]})
+        return gallery
+
+    # Delete the oldest images beyond the size cap, together with their thumbnails.
+    def _Prune(self):
+        with self._lock:
+            old = self._db.execute("SELECT path, thumbnail FROM images ORDER BY created DESC LIMIT -1 OFFSET ?", (self.max_images,)).fetchall()
+            for path, thumbnail in old:
+                for file_path in (path, thumbnail or os.path.splitext(path)[0] + "_thumb.jpg"):
+                    try:
+                        os.remove(file_path)
+                    except OSError:
+                        pass
+                self._db.execute("DELETE FROM images WHERE path = ?", (path,))
+            if old:
+                self._db.execute("DELETE FROM sets WHERE used < ? AND key NOT IN (SELECT DISTINCT set_key FROM images)", (time.time() - 3600,))
+                self._db.commit()
@@ -0,0 +1,117 @@
+import re # Import re for the command patterns.
+import time # Import time to measure how long classification takes.
+import threading # Import threading to guard the statistics.
+from Backend.Config import env_vars # Import the shared settings for the assistant's name.
+
+# The assistant's name, which people often say before or after a command.
+AssistantWord = re.escape((env_vars.get("Assistantname") or "jarvis").lower())
+
+# Fillers removed from the start and the end of an utterance before matching.
+Fillers = re.compile(rf"^(?:(?:hey|hi|ok|okay|{AssistantWord}|please|kindly|can you|could you|would you|will you|i want you to|i want to)\s+)+")
+TrailingFillers = re.compile(rf"(?:\s+(?:please|for me|now|right now|{AssistantWord}))+$")
+
+# Separators between the parts of a compound utterance such as "open chrome and play despacito".
+Separators = re.compile(r"\s*(?:,|\band then\b|\bthen\b|\band\b|\balso\b)\s*")
+
+# Rules of the form (pattern, decision template, confidence); the first match wins.
+Rules = [
+    (re.compile(r"^(?:exit|quit|bye|goodbye|good bye)$"), "exit", 0.95),
+    (re.compile(r"^(?:mute|mute the (?:system|volume|sound))$"), "system mute", 0.95),
+    (re.compile(r"^(?:unmute|unmute the (?:system|volume|sound))$"), "system unmute", 0.95),
+    (re.compile(r"^(?:volume up|(?:increase|raise|turn up) (?:the )?volume)$"), "system volume up", 0.95),
+    (re.compile(r"^(?:volume down|(?:decrease|lower|reduce|turn down) (?:the )?volume)$"), "system volume down", 0.95),
+    (re.compile(r"^(?:generate|create|make|draw) (?:an? )?(?:image|images|picture|pictures|photo|photos) (?:of |for |about )?(?P<x>.+)$"), "generate image {x}", 0.9),
+    (re.compile(r"^youtube search (?:for )?(?P<x>.+)$"), "youtube search {x}", 0.95),
+    (re.compile(r"^search (?:youtube|on youtube) for (?P<x>.+)$"), "youtube search {x}", 0.9),
+    (re.compile(r"^search (?:for )?(?P<x>.+) on youtube$"), "youtube search {x}", 0.9),
+    (re.compile(r"^google search (?:for )?(?P<x>.+)$"), "google search {x}", 0.95),
+    (re.compile(r"^(?:search google|google) for (?P<x>.+)$"), "google search {x}", 0.9),
+    (re.compile(r"^search (?:for )?(?P<x>.+) on google$"), "google search {x}", 0.9),
+    (re.compile(r"^(?:write|draft|compose) (?:me )?(?P<x>(?:an? )?(?:letter|application|essay|article|email|poem|story|note|code|program)\b.*)$"), "content {x}", 0.85),
+    (re.compile(r"^play (?P<x>.+)$"), "play {x}", 0.9),
+    (re.compile(r"^(?:open|launch) (?P<x>[\w .+-]+)$"), "open {x}", 0.9),
+    (re.compile(r"^(?:close|quit|exit) (?P<x>[\w .+-]+)$"), "close {x}", 0.9),
+]
+
+# Verbs that carry over to a bare object, as in "open chrome and firefox"; not "play", titles often contain "and".
+CarryOverVerbs = ("open", "close")
+
+# Words that suggest a question or a reference the rules cannot resolve.
+AmbiguousWords = {"it", "this", "that", "what", "why", "how", "who", "when", "where", "which", "me", "my"}
+
+# Deterministic pre-classifier for command-like utterances, in front of the Cohere decision model.
+class LocalClassifier:
+    def __init__(self, threshold=0.8):
+        self.threshold = threshold # Minimum confidence for answering without Cohere.
+        self._lock = threading.Lock()
+        self.hits = 0 # Utterances answered locally.
+        self.misses = 0 # Utterances passed on to Cohere.
+        self.remote_seconds = 0.0 # Total time spent in Cohere calls.
+        self.local_seconds = 0.0 # Total time spent in local classification of hits.
+
+    # Classify one part of an utterance; returns (decision, confidence) or (None, 0.0).
+    def _ClassifyPart(self, part, previous):
+        for pattern, template, confidence in Rules:
+            match = pattern.match(part)
+            if match is None:
+                continue
+            target = match.groupdict().get("x", "").strip()
+            words = target.split()
+            if template.startswith(("open", "close")) and (len(words) > 4 or AmbiguousWords.intersection(words)):
+                confidence -= 0.3 # Long or referential objects are better left to the model.
+            if template.startswith("play") and AmbiguousWords.intersection(words[:1]):
+                confidence -= 0.3 # "play it again", "play what I liked".
+            return template.format(x=target), confidence
+
+        # A bare object after "open chrome and ..." reuses the previous verb.
+        if previous and previous.split()[0] in CarryOverVerbs and 0 < len(part.split()) <= 2 and not AmbiguousWords.intersection(part.split()):
+            return f"{previous.split()[0]} {part}", 0.85
+        return None, 0.0
+
+    # Classify a whole utterance; returns (decisions, confidence), decisions is None when unsure.
+    def Classify(self, prompt):
+        text = re.sub(r"[.!?]+$", "", prompt.lower().strip())
+        decisions = []
+        confidence = 1.0
+        for part in Separators.split(text):
+            part = TrailingFillers.sub("", Fillers.sub("", part.strip()))
+            if not part:
+                continue
+            decision, part_confidence = self._ClassifyPart(part, decisions[-1] if decisions else None)
+            if decision is None:
+                return None, 0.0 # Anything that is not a command (e.g. a general question) goes to the model.
+            decisions.append(decision)
+            confidence = min(confidence, part_confidence)
+        if not decisions:
+            return None, 0.0
+        return decisions, confidence
+
+    # Return the local decisions if confident enough, otherwise None; updates the hit statistics.
+    def Decide(self, prompt):
+        start = time.perf_counter()
+        decisions, confidence = self.Classify(prompt)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            if decisions is not None and confidence >= self.threshold:
+                self.hits += 1
+                self.local_seconds += elapsed
+                return decisions
+            self.misses += 1
+        return None
+
+    # Record the duration of a Cohere call so the saved latency can be estimated.
+    def RecordRemote(self, seconds):
+        with self._lock:
+            self.remote_seconds += seconds
+
+    # Hit rate and estimated latency saved, using the average Cohere call time for every local hit.
+    def Report(self):
+        with self._lock:
+            total = self.hits + self.misses
+            average_remote = self.remote_seconds / self.misses if self.misses else 0.0
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "saved_seconds": max(0.0, self.hits * average_remote - self.local_seconds),
+            }
@@ -1,15 +1,12 @@
-import cohere # Import the Cohere library for AI services.
 from rich import print # Import the Rich library to enhance terminal outputs.
-from dotenv import dotenv_values # Import dotenv to load environment variables from a .env file.
+from Backend.Config import env_vars, CohereClient # Import the shared settings and the lazily created Cohere client.
+from Backend.LocalClassifier import LocalClassifier # Import the local rule-based pre-classifier.
+from Backend.Tracing import Trace # Import the span tracer.
+import time # Import time to measure the Cohere round trip.
+import asyncio # Import asyncio for the async entry point.
 
-# Load environment variables from the .env file.
-env_vars = dotenv_values(".env")
-
-# Retrieve API key.
-CohereAPIKey = env_vars.get("CohereAPIKey")
-
-# Create a Cohere client using the provided API key.
-co = cohere.Client(api_key=CohereAPIKey)
+# Local classifier that answers obvious commands without calling Cohere.
+FastPath = LocalClassifier(threshold=float(env_vars.get("FastPathThreshold", 0.8)))
 
 # Define a list of recognized function keywords for task categorization.
 funcs = [
@@ -47,11 +44,33 @@ ChatHistory = [
 
 # Define the main function for decision-making on queries.
 def FirstLayerDMM(prompt: str = "test"):
+    # Try the local fast path first; it only answers when it is confident.
+    with Trace.Span("decision.fast_path") as span:
+        Decision = FastPath.Decide(prompt)
+        span["hit"] = Decision is not None
+    if Decision is not None:
+        print(f"Fast path: {FastPath.Report()}")
+        return Decision
+
+    # Otherwise ask Cohere and record how long it took.
+    start = time.perf_counter()
+    try:
+        with Trace.Span("decision.cohere"):
+            return CohereDMM(prompt)
+    finally:
+        FastPath.RecordRemote(time.perf_counter() - start)
+
+# Async version of FirstLayerDMM; the Cohere call runs in the shared loop's thread pool.
+async def FirstLayerDMMAsync(prompt: str = "test"):
+    return await asyncio.to_thread(FirstLayerDMM, prompt)
+
+# Function that classifies a query with the Cohere model.
+def CohereDMM(prompt: str = "test"):
     # Add the user's query to the messages list.
     messages.append({"role": "user", "content": f"{prompt}"})
 
     # Create a streaming chat session with the Cohere model.
-    stream = co.chat_stream(
+    stream = CohereClient().chat_stream(
         model='command-r-plus',  # Specify the Cohere model to use.
         message=prompt,          # Pass the user's query.
         temperature=0.7,         # Set the creativity level of the model.
@@ -90,7 +109,7 @@ def FirstLayerDMM(prompt: str = "test"):
 
     # If '(query)' is in the response, recursively call the function for further clarification.
     if any("(query)" in task for task in response):
-        new_response = FirstLayerDMM(prompt=prompt)
+        new_response = CohereDMM(prompt=prompt)
         return new_response # Return the clarified response.
     else:
         return response
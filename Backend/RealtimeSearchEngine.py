@@ -1,19 +1,19 @@
 from googlesearch import search
-from groq import Groq  # Importing the Groq library to use its API.
-from json import load, dump  # Importing functions to read and write JSON files.
+from Backend.Conversation import Conversation  # Importing the conversation shared with the other backends.
+from Backend.Chatbot import Context  # Importing the context window; the history and its summary are shared with the chatbot.
+from Backend.Cache import PersistentCache  # Importing the persistent TTL/LRU cache.
+from Backend.Tracing import Trace  # Importing the span tracer.
 import datetime  # Importing the datetime module for real-time date and time information.
-from dotenv import dotenv_values  # Importing dotenv values to read environment variables from a .env file.
-
-# Load environment variables from the .env file.
-env_vars = dotenv_values(".env")
+from Backend.Config import env_vars, GroqClient  # Importing the shared settings and the lazily created Groq client.
+from concurrent.futures import ThreadPoolExecutor  # Importing a thread pool for speculative searches.
+import threading  # Importing threading to guard the speculation counters.
+import os  # Importing os for file paths.
+import re  # Importing re to normalize queries and detect volatile topics.
 
 # Retrieve environment variables for the chatbot configuration.
 Username = env_vars.get("Username")
 Assistantname = env_vars.get("Assistantname")
-GroqAPIKey = env_vars.get("GroqAPIKey")
-
-# Initialize the Groq client with the provided API key.
-client = Groq(api_key=GroqAPIKey)
+RealtimeContextBudget = int(env_vars.get("RealtimeContextBudget", 5800)) # Prompt token budget including the search results; llama3-70b-8192 also needs room for the 2048-token answer.
 
 # Define the system instructions for the chatbot.
 System = f"""Hello, I am {Username}, You are a very accurate and advanced AI chatbot named {Assistantname} 
@@ -21,29 +21,97 @@ which has real-time up-to-date information from the internet.
 *** Provide Answers In a Professional Way, make sure to add full stops, commas, question marks, and use proper grammar.***
 *** Just answer the question from the provided data in a professional way. ***"""
 
-# Try to load the chat log from a JSON file, or create an empty one if it doesn't exist.
-try:
-    with open(r"Data\ChatLog.json", "r") as f:
-        messages = load(f)
-except FileNotFoundError:
-    with open(r"Data\ChatLog.json", "w") as f:
-        dump([], f)
-        messages = []  # Initialize messages list if file is not found
+# Cache of search results: a small memory tier in front of a larger SQLite tier.
+SearchCache = PersistentCache(
+    os.path.join("Data", "SearchCache.sqlite"),
+    max_entries=int(env_vars.get("SearchCacheSize", 1000)),
+    max_memory_entries=int(env_vars.get("SearchCacheMemorySize", 100)),
+    ttl=float(env_vars.get("SearchCacheTTL", 7 * 24 * 3600))  # Evergreen topics.
+)
+
+# News, weather, scores and prices change quickly, so they get a much shorter time to live.
+VolatileTopics = re.compile(r"\b(news|weather|forecast|temperature|rain|score|scores|match|live|stock|stocks|price|prices|rate|today|tonight|now|current|latest|election|traffic)\b")
+VolatileSearchTTL = float(env_vars.get("VolatileSearchCacheTTL", 15 * 60))
+
+# Function to normalize a query so equivalent searches share one cache entry.
+def NormalizeSearchQuery(query):
+    return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
+# Function to run the actual Google search.
+def FetchSearchResults(query):
+    with Trace.Span("search.google"):
+        return [{"title": i.title, "description": i.description} for i in search(query, advanced=True, num_results=5)]
+
+# Function to get search results from the cache, fetching them once when missing.
+def SearchResults(query):
+    key = NormalizeSearchQuery(query)
+    ttl = VolatileSearchTTL if VolatileTopics.search(key) else None
+    with Trace.Span("search"):
+        return SearchCache.GetOrFetch(key, lambda: FetchSearchResults(query), ttl=ttl)
+
+# Function to format search results for the model.
+def FormatSearchResults(query, results):
+    Answer = f"The search results for '{query}' are:\n[start]\n"
+    
+    for i in results:
+        Answer += f"Title: {i['title']}\nDescription: {i['description']}\n\n"
+
+    Answer += "[end]"
+    return Answer
 
 # Function to perform a Google search and format the results.
 def GoogleSearch(query):
     try:
-        results = list(search(query, advanced=True, num_results=5))
-        Answer = f"The search results for '{query}' are:\n[start]\n"
-        
-        for i in results:
-            Answer += f"Title: {i.title}\nDescription: {i.description}\n\n"
-
-        Answer += "[end]"
-        return Answer
+        return FormatSearchResults(query, SearchResults(query))
     except Exception as e:
         return f"Error fetching Google results: {str(e)}"
 
+# Starts searches for the raw query while the decision model is still running.
+class SearchPrefetcher:
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="SearchPrefetch")
+        self._lock = threading.Lock()
+        self.started = 0 # Speculative searches started.
+        self.used = 0 # Speculative searches whose results were used.
+        self.wasted = 0 # Speculative searches discarded because the query was not realtime or was a different one.
+
+    # Start searching for the query in the background.
+    def Start(self, query):
+        with self._lock:
+            self.started += 1
+        future = self._executor.submit(SearchResults, query)
+        future.query = query
+        return future
+
+    # Return the formatted prefetched results for `query`, or None if they are for another query or the search failed.
+    # `same_request` says the query is the whole utterance reworded, e.g. a turn with a single realtime decision.
+    def Use(self, future, query, same_request=False):
+        if not same_request and NormalizeSearchQuery(future.query) != NormalizeSearchQuery(query):
+            self.Discard(future) # E.g. the realtime part of a compound utterance; it gets its own search.
+            return None
+        with self._lock:
+            self.used += 1
+        try:
+            return FormatSearchResults(future.query, future.result())
+        except Exception as e:
+            print(f"Speculative search failed: {e}")
+            return None
+
+    # Drop a speculative search that turned out not to be needed.
+    def Discard(self, future):
+        with self._lock:
+            self.wasted += 1
+        future.cancel() # Only stops it if it has not started yet; a finished search still warms the cache.
+
+    # Share of speculative searches that were wasted.
+    def Report(self):
+        with self._lock:
+            finished = self.used + self.wasted
+            return {"started": self.started, "used": self.used, "wasted": self.wasted, "wasted_ratio": self.wasted / finished if finished else 0.0}
+
+# Shared prefetcher used by MainExecution.
+Prefetcher = SearchPrefetcher()
+
 # Function to clean up the answer by removing empty lines.
 def AnswerModifier(Answer):
     lines = Answer.split('\n')
@@ -70,53 +138,66 @@ def Information():
     )
     return data
 
-# Function to handle real-time search and response generation.
-def RealtimeSearchEngine(prompt):
-    global SystemChatBot, messages
-
-    # Load the chat log from the JSON file.
-    with open(r"Data\ChatLog.json", "r") as f:
-        messages = load(f)
-        
-    messages.append({"role": "user", "content": f"{prompt}"})
-
-    # Add Google search results to the system chatbot messages.
-    SystemChatBot.append({"role": "system", "content": GoogleSearch(prompt)})
-
-    # Generate a response using the Groq client.
-    completion = client.chat.completions.create(
-        model="llama3-70b-8192",
-        messages=SystemChatBot + [{"role": "system", "content": Information()}] + messages,
-        temperature=0.7,
-        max_tokens=2048,
-        top_p=1,
-        stream=True,
-        stop=None
-    )
+# Function to handle real-time search and stream the generated response piece by piece.
+def RealtimeSearchEngineStream(prompt, Prefetched=None, Retries=1):
+    UserMessage = {"role": "user", "content": f"{prompt}"}
 
     # Initialize an empty string for the response.
     Answer = ""
+    SearchResults = Prefetched
+
+    try:
+        # Google search results, reusing prefetched ones when available; kept local so concurrent turns cannot mix them up.
+        SearchResults = SearchResults or GoogleSearch(prompt)
+        SearchMessage = {"role": "system", "content": SearchResults}
+
+        # Fit the instructions, the search results and the shared history into the token budget; a retry gets half of it.
+        Prompt = Context.Build(
+            SystemChatBot + [SearchMessage, {"role": "system", "content": Information()}],
+            Conversation.Snapshot() + [UserMessage],
+            budget=RealtimeContextBudget if Retries > 0 else RealtimeContextBudget // 2
+        )
+        print(f"Context tokens: {Context.LastUsage}")
+
+        # Generate a response using the Groq client.
+        completion = GroqClient().chat.completions.create(
+            model="llama3-70b-8192",
+            messages=Prompt,
+            temperature=0.7,
+            max_tokens=2048,
+            top_p=1,
+            stream=True,
+            stop=None
+        )
+
+        # Yield response chunks from the streaming output as they arrive.
+        for chunk in Trace.Stream("llm.realtime", completion):
+            Delta = chunk.choices[0].delta.content
+            if Delta:
+                Delta = Delta.replace("</s>", "")
+                if not Answer:
+                    Delta = Delta.lstrip()  # Drop leading whitespace before the first visible text.
+                    if not Delta:
+                        continue
+                Answer += Delta
+                yield Delta
 
-    # Concatenate response chunks from the streaming output.
-    for chunk in completion:
-        if chunk.choices[0].delta.content:
-            Answer += chunk.choices[0].delta.content
+    except Exception as e:
+        # Handle errors by printing the exception; the retry reuses the search results with a smaller prompt.
+        print(f"Error: {e}")
+        if not Answer and Retries > 0:
+            yield from RealtimeSearchEngineStream(prompt, SearchResults, Retries - 1)  # Retry only if nothing has been shown yet.
+        return
 
     # Clean up the response.
     Answer = Answer.strip().replace("</s>", "")
 
-    # Append the chatbot's response to the messages list.
-    messages.append({"role": "assistant", "content": Answer})
-
-    # Save the updated chat log back to the JSON file.
-    with open(r"Data\ChatLog.json", "w") as f:
-        dump(messages, f, indent=4)
+    # Add the completed turn to the shared conversation; it is written to the chat log in the background.
+    Conversation.AddTurn([UserMessage, {"role": "assistant", "content": Answer}])
 
-    # Remove the most recent system message from the chatbot conversation.
-    if len(SystemChatBot) > 1:
-        SystemChatBot.pop()
-
-    return AnswerModifier(Answer)
+# Function to handle real-time search and response generation.
+def RealtimeSearchEngine(prompt, Prefetched=None):
+    return AnswerModifier("".join(RealtimeSearchEngineStream(prompt, Prefetched)))
 
 # Main entry point of the program for interactive querying.
 if __name__ == "__main__":
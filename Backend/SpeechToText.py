@@ -1,15 +1,15 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from dotenv import dotenv_values
+from abc import ABC, abstractmethod
+from Backend.Config import env_vars
+from Backend.EventBus import Bus
+from Backend.Translation import Translator, TranslationCache
+from Backend.Tracing import Trace
 import os
+import json
+import time
+import wave
+import threading
 import mtranslate as mt
 
-# Load environment variables from the .env file.
-env_vars = dotenv_values(".env")
-
 # Get the input language setting from the environment variables.
 InputLanguage = env_vars.get("InputLanguage")
 
@@ -26,25 +26,62 @@ HtmlCode = '''<!DOCTYPE html>
     <script>
         const output = document.getElementById('output');
         let recognition;
+        let listening = false;
+        let pending = null;
+        let buffer = '';
+
+        function deliver() {
+            if (pending && buffer) {
+                const callback = pending;
+                const text = buffer;
+                pending = null;
+                buffer = '';
+                callback(text);
+            }
+        }
+
+        function waitForTranscript(callback, timeoutMs) {
+            pending = callback;
+            setTimeout(function() {
+                if (pending === callback) {
+                    pending = null;
+                    callback(null);
+                }
+            }, timeoutMs);
+            deliver();
+        }
 
         function startRecognition() {
+            if (listening) {
+                return;
+            }
+            listening = true;
+            buffer = '';
             recognition = new webkitSpeechRecognition() || new SpeechRecognition();
-            recognition.lang = '';
+            recognition.lang = '__LANGUAGE__';
             recognition.continuous = true;
 
             recognition.onresult = function(event) {
                 const transcript = event.results[event.results.length - 1][0].transcript;
                 output.textContent += transcript;
+                buffer += transcript;
+                deliver();
             };
 
             recognition.onend = function() {
-                recognition.start();
+                if (listening) {
+                    recognition.start();
+                }
             };
             recognition.start();
         }
 
         function stopRecognition() {
-            recognition.stop();
+            listening = false;
+            buffer = '';
+            if (recognition) {
+                recognition.stop();
+            }
             output.innerHTML = "";
         }
     </script>
@@ -52,11 +89,7 @@ HtmlCode = '''<!DOCTYPE html>
 </html>'''
 
 # Replace the language setting in the HTML code with the input language from the environment variables.
-HtmlCode = str(HtmlCode).replace("recognition.lang ='';", f"recognition.lang = '{InputLanguage}';")
-
-# Write the modified HTML code to a file.
-with open(r"Data\Voice.html", "w") as f:
-    f.write(HtmlCode)
+HtmlCode = str(HtmlCode).replace("__LANGUAGE__", f"{InputLanguage}")
 
 # Get the current working directory.
 current_dir = os.getcwd()
@@ -64,25 +97,17 @@ current_dir = os.getcwd()
 # Generate the file path for the HTML file.
 Link = f"{current_dir}/Data/Voice.html"
 
-# Set Chrome options for the WebDriver.
-chrome_options = Options()
-user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/89.0.142.86 Safari/537.36"
-chrome_options.add_argument(f'user-agent={user_agent}')
-chrome_options.add_argument("--use-fake-ui-for-media-stream")
-chrome_options.add_argument("--use-fake-device-for-media-stream")
-chrome_options.add_argument("--headless=new")
-
-# Initialize the Chrome WebDriver using the ChromeDriverManager
-service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service, options=chrome_options)
+# Recognizer used by SpeechRecognition: "selenium" (browser speech API) or "replay" (recorded transcripts or WAV files).
+SpeechBackend = str(env_vars.get("SpeechBackend", "selenium")).lower()
 
-# Define the path for temporary files.
-TempDirPath = rf"{current_dir}/Frontend/Files"
+# Replay settings: a transcript file (.txt, .jsonl), a WAV file or a folder of WAV files, a time scale (1.0 = real time, 0.5 = twice as fast, 0 = no waiting) and whether to start over at the end.
+SpeechReplaySource = env_vars.get("SpeechReplaySource", os.path.join("Data", "Replay"))
+SpeechReplayTimeScale = float(env_vars.get("SpeechReplayTimeScale", 1.0))
+SpeechReplayLoop = str(env_vars.get("SpeechReplayLoop", "True")).lower() == "true"
 
-# Function to set the assistant's status by writing it to a file.
+# Function to set the assistant's status by publishing it on the shared event bus.
 def SetAssistantStatus(Status):
-    with open(rf'{TempDirPath}/Status.data', "w", encoding='utf-8') as file:
-        file.write(Status)
+    Bus.Publish("Status", Status)
 
 # Function to modify a query to ensure proper punctuation and formatting.
 def QueryModifier(Query):
@@ -103,38 +128,223 @@ def QueryModifier(Query):
 
     return new_query.capitalize()
 
+# Translation layer in front of mtranslate: text that is English already is not sent, recent translations are cached,
+# and a slow endpoint falls through to the original text after TranslationTimeout seconds.
+Translation = Translator(
+    lambda Text: mt.translate(Text, "en", "auto"),
+    TranslationCache(max_entries=int(env_vars.get("TranslationCacheSize", 500))),
+    timeout=float(env_vars.get("TranslationTimeout", 3))
+)
+
 # Function to translate text into English using the mtranslate library.
 def UniversalTranslator(Text):
-    english_translation = mt.translate(Text, "en", "auto")
+    with Trace.Span("stt.translate"):
+        english_translation = Translation.Translate(Text)
     return english_translation.capitalize()
 
-# Function to perform speech recognition using the WebDriver.
-def SpeechRecognition():
-    # Open the HTML file in the browser.
-    driver.get("file:///" + Link)
-    
-    # Start speech recognition by clicking the start button.
-    driver.find_element(by=By.ID, value="start").click()
+# How long one wait for a transcript may block inside the browser before it is renewed.
+TranscriptWaitSeconds = 30
 
-    while True:
+# Interface of a speech recognizer: Listen() blocks until one utterance is heard and returns its raw transcript.
+class SpeechRecognizer(ABC):
+    @abstractmethod
+    def Listen(self):
+        pass
+
+    # Prepare everything Listen() needs ahead of the first turn; called from the startup warm-up.
+    def Warm(self):
+        pass
+
+    def Close(self):
+        pass
+
+# File remembering where the ChromeDriver binary was installed, so later starts skip the network check of ChromeDriverManager.
+ChromeDriverPathFile = os.path.join("Data", "ChromeDriverPath.txt")
+
+# Function to return the ChromeDriver path, installing the driver only when no cached path exists or `refresh` is set.
+def ChromeDriverPath(refresh=False):
+    if not refresh and os.path.exists(ChromeDriverPathFile):
+        with open(ChromeDriverPathFile, "r", encoding="utf-8") as f:
+            path = f.read().strip()
+        if os.path.exists(path):
+            return path
+
+    from webdriver_manager.chrome import ChromeDriverManager
+    path = ChromeDriverManager().install()
+    with open(ChromeDriverPathFile, "w", encoding="utf-8") as f:
+        f.write(path)
+    return path
+
+# Function to write the recognition page, skipping the write when it is already up to date.
+def WriteRecognitionPage():
+    if os.path.exists(r"Data\Voice.html"):
+        with open(r"Data\Voice.html", "r") as f:
+            if f.read() == HtmlCode:
+                return
+    with open(r"Data\Voice.html", "w") as f:
+        f.write(HtmlCode)
+
+# Recognizer using webkitSpeechRecognition in headless Chrome; Chrome is started on first use, Selenium is imported only then.
+class SeleniumRecognizer(SpeechRecognizer):
+    def __init__(self):
+        self.driver = None
+        self._lock = threading.Lock() # The warm-up and the first turn may both ask for the driver.
+
+    # Start Chrome on first use.
+    def _Driver(self):
+        with self._lock:
+            if self.driver is None:
+                from selenium import webdriver
+                from selenium.common.exceptions import SessionNotCreatedException
+                from selenium.webdriver.chrome.service import Service
+                from selenium.webdriver.chrome.options import Options
+
+                WriteRecognitionPage()
+
+                # Set Chrome options for the WebDriver.
+                chrome_options = Options()
+                user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/89.0.142.86 Safari/537.36"
+                chrome_options.add_argument(f'user-agent={user_agent}')
+                chrome_options.add_argument("--use-fake-ui-for-media-stream")
+                chrome_options.add_argument("--use-fake-device-for-media-stream")
+                chrome_options.add_argument("--headless=new")
+
+                # Start Chrome with the cached driver; a driver that no longer matches Chrome is installed again.
+                try:
+                    self.driver = webdriver.Chrome(service=Service(ChromeDriverPath()), options=chrome_options)
+                except SessionNotCreatedException:
+                    self.driver = webdriver.Chrome(service=Service(ChromeDriverPath(refresh=True)), options=chrome_options)
+            return self.driver
+
+    # Load the recognition page once and keep it alive between turns.
+    def _EnsurePage(self):
+        from selenium.common.exceptions import WebDriverException
+        driver = self._Driver()
         try:
-            # Get the recognized text from the HTML output element.
-            Text = driver.find_element(by=By.ID, value="output").text
+            if driver.execute_script("return typeof waitForTranscript === 'function';"):
+                return
+        except WebDriverException:
+            pass
+        driver.get("file:///" + Link)
+        driver.set_script_timeout(TranscriptWaitSeconds)
+
+    def Warm(self):
+        self._EnsurePage()
+
+    def Listen(self):
+        from selenium.common.exceptions import TimeoutException, WebDriverException
+
+        # Load the page if needed and start listening.
+        self._EnsurePage()
+        self.driver.execute_script("startRecognition();")
+
+        while True:
+            try:
+                # Block until the page pushes a transcript; the Python side sleeps in the WebDriver call.
+                # The page answers null a little before the script timeout so no transcript is handed to a stale callback.
+                Text = self.driver.execute_async_script(
+                    "waitForTranscript(arguments[arguments.length - 1], arguments[0]);",
+                    (TranscriptWaitSeconds - 5) * 1000
+                )
+            except TimeoutException:
+                continue  # Nothing said yet; wait again.
+            except WebDriverException as e:
+                print(f"Speech recognition page error: {e}")
+                self._EnsurePage()
+                self.driver.execute_script("startRecognition();")
+                continue
 
             if Text:
-                # Stop recognition by clicking the stop button.
-                driver.find_element(by=By.ID, value="end").click()
+                # Stop listening until the next turn.
+                self.driver.execute_script("stopRecognition();")
+                return Text
+
+    def Close(self):
+        if self.driver is not None:
+            self.driver.quit()
+
+# Recognizer that replays recorded utterances with realistic timing, for benchmarks and tests without a microphone, browser or network.
+# Sources:
+#   .txt   - one utterance per line.
+#   .jsonl - {"text": ..., "delay": seconds of silence before it, "duration": seconds of speech} per line.
+#   .wav   - a file or a folder of files; each needs a transcript next to it (same name, .txt) and takes as long as its audio.
+class ReplayRecognizer(SpeechRecognizer):
+    def __init__(self, source, time_scale=1.0, loop=True, delay=1.0, words_per_second=2.5):
+        self.time_scale = time_scale # Multiplies every wait: 1.0 waits in real time, 0 returns immediately.
+        self.loop = loop # Start over after the last utterance instead of raising EOFError.
+        self.delay = delay # Default silence before an utterance.
+        self.words_per_second = words_per_second # Speaking rate used when no duration is known.
+        self.utterances = self._Load(source)
+        self.position = 0
+        if not self.utterances:
+            raise ValueError(f"No utterances to replay in {source}")
 
-                # If the input language is English, return the modified query.
-                if InputLanguage.lower() == "en" or "en" in InputLanguage.lower():
-                    return QueryModifier(Text)
+    # Read the source into a list of {"text", "delay", "duration"} entries.
+    def _Load(self, source):
+        if os.path.isdir(source):
+            files = sorted(os.path.join(source, name) for name in os.listdir(source) if name.lower().endswith(".wav"))
+            return [self._LoadWav(path) for path in files]
+        if source.lower().endswith(".wav"):
+            return [self._LoadWav(source)]
+
+        utterances = []
+        with open(source, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if source.lower().endswith(".jsonl"):
+                    entry = json.loads(line)
                 else:
-                    # If the input language is not English, translate the text and return it.
-                    SetAssistantStatus("Translating ...")
-                    return QueryModifier(UniversalTranslator(Text))
+                    entry = {"text": line}
+                entry.setdefault("delay", self.delay)
+                entry.setdefault("duration", len(entry["text"].split()) / self.words_per_second)
+                utterances.append(entry)
+        return utterances
 
-        except Exception as e:
-            pass
+    # A WAV utterance lasts as long as its audio; the transcript comes from the .txt file next to it.
+    def _LoadWav(self, path):
+        with wave.open(path, "rb") as audio:
+            duration = audio.getnframes() / float(audio.getframerate())
+        with open(os.path.splitext(path)[0] + ".txt", "r", encoding="utf-8") as f:
+            text = f.read().strip()
+        return {"text": text, "delay": self.delay, "duration": duration}
+
+    def Listen(self):
+        if self.position >= len(self.utterances):
+            if not self.loop:
+                raise EOFError("Replay finished")
+            self.position = 0
+        entry = self.utterances[self.position]
+        self.position += 1
+
+        # Like the browser, the transcript arrives only after the silence and the speech are over.
+        time.sleep((entry["delay"] + entry["duration"]) * self.time_scale)
+        return entry["text"]
+
+# Function to create the recognizer selected in the .env file.
+def CreateRecognizer(Backend=SpeechBackend):
+    if Backend == "replay":
+        return ReplayRecognizer(SpeechReplaySource, time_scale=SpeechReplayTimeScale, loop=SpeechReplayLoop)
+    if Backend == "selenium":
+        return SeleniumRecognizer()
+    raise ValueError(f"Unknown speech backend: {Backend}")
+
+# Recognizer shared by every turn.
+Recognizer = CreateRecognizer()
+
+# Function to listen for one utterance and return it as a formatted English query.
+def SpeechRecognition():
+    with Trace.Span("stt.listen"):
+        Text = Recognizer.Listen()
+
+    # If the input language is English, return the modified query.
+    if InputLanguage.lower() == "en" or "en" in InputLanguage.lower():
+        return QueryModifier(Text)
+    else:
+        # If the input language is not English, translate the text and return it.
+        SetAssistantStatus("Translating ...")
+        return QueryModifier(UniversalTranslator(Text))
 
 # Main execution block.
 if __name__ == "__main__":
@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor # Import a thread pool to warm subsystems in parallel.
+from contextlib import contextmanager # Import contextmanager for timed blocks.
+import threading # Import threading to guard the timings and signal milestones.
+import json # Import json to save the report.
+import time # Import time for the timings.
+import os # Import os for the report path.
+
+# Records how long each part of startup takes, measured from the moment this module is first imported.
+class StartupTimer:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._entries = {} # name -> {"start", "seconds", "error"}, offsets in seconds from the origin.
+        self._marks = {} # name -> threading.Event, set when the milestone is reached.
+
+    # Offset of now from the origin.
+    def Now(self):
+        return time.perf_counter() - self.origin
+
+    # Time a block of code as one subsystem; an error is recorded and raised again.
+    @contextmanager
+    def Measure(self, name):
+        start = self.Now()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            with self._lock:
+                self._entries[name] = {"start": start, "seconds": self.Now() - start, "error": error}
+
+    # Record a milestone such as "gui" and wake up threads waiting for it.
+    def Mark(self, name):
+        with self._lock:
+            self._entries[name] = {"start": self.Now(), "seconds": 0.0, "error": None}
+            self._marks.setdefault(name, threading.Event()).set()
+
+    # Block until a milestone is reached; returns False on timeout.
+    def WaitForMark(self, name, timeout=None):
+        with self._lock:
+            event = self._marks.setdefault(name, threading.Event())
+        return event.wait(timeout)
+
+    # Run the named tasks in parallel in the background; failures are recorded, not raised.
+    # Returns a thread that finishes once every task is done and the report is printed and saved.
+    def Warmup(self, tasks, workers=4):
+        def Run(name, task):
+            try:
+                with self.Measure(name):
+                    task()
+            except Exception as e:
+                print(f"Warm-up of {name} failed: {e}")
+
+        def Worker():
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Warmup") as pool:
+                for name, task in tasks.items():
+                    pool.submit(Run, name, task)
+            self.Mark("warmup")
+            self.PrintReport()
+            self.Save()
+
+        thread = threading.Thread(target=Worker, name="Warmup", daemon=True)
+        thread.start()
+        return thread
+
+    # Timings in the order things started.
+    def Report(self):
+        with self._lock:
+            return dict(sorted(self._entries.items(), key=lambda item: item[1]["start"]))
+
+    def PrintReport(self):
+        print("Startup timing (seconds from launch):")
+        for name, entry in self.Report().items():
+            status = f"  FAILED: {entry['error']}" if entry["error"] else ""
+            print(f"  {name:<20} at {entry['start']:7.3f}  took {entry['seconds']:7.3f}{status}")
+
+    # Save the report so startups can be compared over time.
+    def Save(self, path=os.path.join("Data", "StartupReport.json")):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.Report(), f, indent=4)
+        except OSError as e:
+            print(f"Could not save startup report: {e}")
+
+# Timer shared by Main, the GUI and the backend.
+Startup = StartupTimer()
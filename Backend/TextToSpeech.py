@@ -1,45 +1,92 @@
 import pygame # Import pygame library for handling audio playback
 import random
-import asyncio # Import asyncio for asynchronous operations
 import edge_tts # Import edge_tts for text-to-speech functionality
 import os # Import os for file path handling
-from dotenv import dotenv_values # Import dotenv for reading environment variables from a .env file
+import re # Import re for sentence segmentation
+import queue # Import queue for passing work between the pipeline threads
+import threading # Import threading to synthesize and play at the same time
+import atexit # Import atexit to close the audio device on shutdown
+from Backend.AudioCache import AudioCache # Import the on-disk cache for synthesized speech
+from Backend.EventLoop import RunAsync # Import the shared event loop instead of starting one per utterance
+from Backend.Tracing import Trace # Import the span tracer
+import time # Import time to measure the delay until speech starts
+from Backend.Config import env_vars # Import the settings parsed from the .env file
 
-# Load environment variables from a .env file
-env_vars = dotenv_values(".env")
 AssistantVoice = env_vars.get("AssistantVoice") # ✅ Fixed missing key
+AssistantPitch = '+5Hz' # ✅ Fixed pitch/rate
+AssistantRate = '+13%'
+
+# Cache of synthesized speech keyed by (text, voice, pitch, rate), capped at TTSCacheSize megabytes.
+SpeechCache = AudioCache(os.path.join("Data", "TTSCache"), int(env_vars.get("TTSCacheSize", 64)) * 1024 * 1024)
 
 # Asynchronous function to convert text to an audio file
-async def TextToAudioFile(text) -> None:
-    file_path = r"Data\speech.mp3" # Define the path where the speech file will be saved
-    
+async def TextToAudioFile(text, file_path=r"Data\speech.mp3") -> None:
     if os.path.exists(file_path):
         os.remove(file_path) # Remove the file if it already exists
     
     # Create the communicate object to generate speech
-    communicate = edge_tts.Communicate(text, AssistantVoice, pitch='+5Hz', rate='+13%') # ✅ Fixed pitch/rate
+    communicate = edge_tts.Communicate(text, AssistantVoice, pitch=AssistantPitch, rate=AssistantRate)
     await communicate.save(file_path) # Save the generated speech as an MP3 file
 
-async def run_TextToAudioFile(text):
-    await TextToAudioFile(text)
+# Function to get an audio file for the text, only calling edge_tts when it is not cached yet.
+def SpeechFile(text):
+    def Synthesize(file_path):
+        with Trace.Span("tts.synthesize", characters=len(text)):
+            RunAsync(TextToAudioFile(text, file_path))
+
+    return SpeechCache.GetOrCreate(
+        Synthesize,
+        text, AssistantVoice, AssistantPitch, AssistantRate
+    )
+
+# Long-lived playback engine that keeps the audio device open between utterances.
+class AudioPlayer:
+    def __init__(self):
+        self._lock = threading.Lock() # Only one file plays at a time.
+        self._clock = None # Created once the mixer is initialized.
+
+    # Initialize the mixer on first use.
+    def _Open(self):
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+            self._clock = pygame.time.Clock()
+
+    # Play a file to the end; returns False if func() asked to stop.
+    def Play(self, file_path, func=lambda r=None: True):
+        with self._lock:
+            self._Open()
+            pygame.mixer.music.load(file_path)
+            pygame.mixer.music.play()
+            try:
+                # Loop until the audio is done playing or the function stops
+                while pygame.mixer.music.get_busy():
+                    if func() == False:
+                        return False
+                    self._clock.tick(10) # Limit the loop to 10 ticks per second
+                return True
+            finally:
+                pygame.mixer.music.stop()
+                pygame.mixer.music.unload() # Release the file so the cache may evict it.
+
+    # Open the audio device ahead of the first utterance.
+    def Warm(self):
+        with self._lock:
+            self._Open()
+
+    # Close the audio device, e.g. when the application exits.
+    def Close(self):
+        with self._lock:
+            if pygame.mixer.get_init():
+                pygame.mixer.quit()
+
+# Shared player used by every utterance.
+Player = AudioPlayer()
+atexit.register(Player.Close)
 
 # Function to manage Text-to-Speech (TTS) functionality
 def TTS(Text, func=lambda r=None: True):
     try:
-        asyncio.run(run_TextToAudioFile(Text)) # ✅ Fixed asyncio.run issue
-        
-        # Initialize pygame mixer for audio playback
-        pygame.mixer.init()
-        pygame.mixer.music.load(r"Data\speech.mp3")
-        pygame.mixer.music.play()
-
-        # Loop until the audio is done playing or the function stops
-        while pygame.mixer.music.get_busy():
-            if func() == False:
-                break
-            pygame.time.Clock().tick(10) # Limit the loop to 10 ticks per second
-
-        return True
+        return Player.Play(SpeechFile(Text), func)
 
     except Exception as e:
         print(f"Error in TTS: {e}")
@@ -47,35 +94,168 @@ def TTS(Text, func=lambda r=None: True):
     finally:
         try:
             func(False)
-            pygame.mixer.music.stop()
-            pygame.mixer.quit()
 
         except Exception as e:
             print(f"Error in finally block: {e}")
 
+# List of predefined responses for cases where the text is too long
+responses = [
+    "The rest of the result has been printed to the chat screen, kindly check it out sir.",
+    "The rest of the text is now on the chat screen, sir, please check it.",
+    "You can see the rest of the text on the chat screen, sir.",
+    "The remaining part of the text is now on the chat screen, sir.",
+    "Sir, you'll find more text on the chat screen for you to see.",
+    "The rest of the answer is now on the chat screen, sir.",
+    "Sir, please look at the chat screen, the rest of the answer is there.",
+    "You'll find the complete answer on the chat screen, sir.",
+    "The next part of the text is on the chat screen, sir.",
+    "Sir, please check the chat screen for more information."
+]
+
+# A sentence ends at ".", "!" or "?" followed by whitespace, so decimals like 3.5 are not split.
+SentenceEnd = re.compile(r"[.!?]+(?=\s)")
+
+# Generator that turns a stream of text pieces into complete sentences as soon as they end.
+def SplitSentences(Deltas):
+    Buffer = ""
+    for Delta in Deltas:
+        Buffer += Delta
+        while True:
+            Match = SentenceEnd.search(Buffer)
+            if Match is None:
+                break
+            Sentence = Buffer[:Match.end()].strip()
+            Buffer = Buffer[Match.end():]
+            if Sentence:
+                yield Sentence
+    if Buffer.strip():
+        yield Buffer.strip() # Whatever is left when the stream ends is the last sentence.
+
+# Pipeline that speaks sentence N while sentence N+1 is being synthesized.
+class SpeechPipeline:
+    def __init__(self, func=lambda r=None: True):
+        self.func = func # Called while playing; returning False stops the speech.
+        self.texts = queue.Queue() # Text pieces fed by the caller, None marks the end.
+        self.audio = queue.Queue(maxsize=1) # Synthesized files waiting to be played.
+        self.stopped = threading.Event() # Set when playback was interrupted or failed.
+        self.received = "" # Full text received so far.
+        self.started = time.perf_counter() # Used to trace how long it takes until the first sentence is heard.
+        self.synthesizer = threading.Thread(target=self._Synthesize, daemon=True)
+        self.player = threading.Thread(target=self._Play, daemon=True)
+        self.synthesizer.start()
+        self.player.start()
+
+    # Add a piece of text to be spoken.
+    def Feed(self, Delta):
+        self.texts.put(Delta)
+
+    # Mark the end of the text stream.
+    def Close(self):
+        self.texts.put(None)
+
+    # Pass a stream through unchanged while feeding every piece to the pipeline.
+    def Tee(self, Deltas):
+        try:
+            for Delta in Deltas:
+                self.Feed(Delta)
+                yield Delta
+        finally:
+            self.Close()
+
+    # Block until everything has been spoken.
+    def Wait(self):
+        self.synthesizer.join()
+        self.player.join()
+
+    # Yield the sentences to speak, keeping the long-answer truncation of TextToSpeech.
+    def _Speakable(self):
+        Text = "" # Everything received so far, used for the length checks.
+        Held = [] # Sentences after the second one, spoken only if the answer turns out short.
+        Count = 0
+        for Sentence in SplitSentences(self._Received()):
+            Count += 1
+            if Count <= 2:
+                yield Sentence # The first two sentences are always spoken right away.
+            else:
+                Held.append(Sentence)
+            # If the text is very long (more than 4 sentences and 250 characters), add a response message
+            if Count >= 2 and len(self.received.split(".")) > 4 and len(self.received) >= 250:
+                yield random.choice(responses)
+                return
+        yield from Held
+
+    # Yield the raw text pieces and keep track of the full text.
+    def _Received(self):
+        for Delta in iter(self.texts.get, None):
+            self.received += str(Delta)
+            yield str(Delta)
+
+    # Synthesize each sentence, staying at most one sentence ahead of playback.
+    def _Synthesize(self):
+        try:
+            for Sentence in self._Speakable():
+                if self.stopped.is_set():
+                    break
+                file_path = SpeechFile(Sentence) # Cached sentences skip edge_tts entirely.
+                while not self.stopped.is_set():
+                    try:
+                        self.audio.put(file_path, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+        except Exception as e:
+            print(f"Error in TTS: {e}")
+        finally:
+            self.audio.put(None)
+
+    # Play the synthesized files in order.
+    def _Play(self):
+        try:
+            for file_path in iter(self.audio.get, None):
+                if self.stopped.is_set():
+                    continue # Drain the queue without playing.
+                if self.started is not None:
+                    Trace.Complete("tts.first_audio", self.started)
+                    self.started = None
+                if not Player.Play(file_path, self.func):
+                    self.stopped.set()
+
+        except Exception as e:
+            self.stopped.set()
+            print(f"Error in TTS: {e}")
+            for _ in iter(self.audio.get, None):
+                pass # Let the synthesizer finish.
+
+        finally:
+            try:
+                self.func(False)
+
+            except Exception as e:
+                print(f"Error in finally block: {e}")
+
+# Function to synthesize phrases into the cache in the background so they play without a network round trip.
+def WarmSpeechCache(Phrases, Background=True):
+    def Warm():
+        for Phrase in Phrases:
+            try:
+                SpeechFile(Phrase)
+            except Exception as e:
+                print(f"Error warming TTS cache: {e}")
+    if Background:
+        threading.Thread(target=Warm, daemon=True).start()
+    else:
+        Warm()
+
+# Function to speak a stream of text while it is still being generated.
+def TextToSpeechStream(Deltas, func=lambda r=None: True):
+    Speech = SpeechPipeline(func)
+    for Delta in Speech.Tee(Deltas):
+        pass
+    Speech.Wait()
+
 # Function to manage Text-to-Speech with additional responses for long text
 def TextToSpeech(Text, func=lambda r=None: True):
-    Data = str(Text).split(".")
-
-    # List of predefined responses for cases where the text is too long
-    responses = [
-        "The rest of the result has been printed to the chat screen, kindly check it out sir.",
-        "The rest of the text is now on the chat screen, sir, please check it.",
-        "You can see the rest of the text on the chat screen, sir.",
-        "The remaining part of the text is now on the chat screen, sir.",
-        "Sir, you'll find more text on the chat screen for you to see.",
-        "The rest of the answer is now on the chat screen, sir.",
-        "Sir, please look at the chat screen, the rest of the answer is there.",
-        "You'll find the complete answer on the chat screen, sir.",
-        "The next part of the text is on the chat screen, sir.",
-        "Sir, please check the chat screen for more information."
-    ]
-
-    # If the text is very long (more than 4 sentences and 250 characters), add a response message
-    if len(Data) > 4 and len(Text) >= 250:
-        TTS(" ".join(Data[0:2]) + ". " + random.choice(responses))
-    else:
-        TTS(Text, func)
+    TextToSpeechStream([str(Text)], func)
 
 # Main execution loop
 if __name__ == "__main__":
@@ -0,0 +1,189 @@
+from contextlib import contextmanager # Import contextmanager for timed spans.
+from Backend.Config import env_vars # Import the shared settings.
+import threading # Import threading to guard the trace file and name threads.
+import json # Import json to write and read trace events.
+import time # Import time for the timestamps.
+import glob # Import glob to find rotated trace files.
+import atexit # Import atexit to flush the trace on shutdown.
+import sys # Import sys for the command line.
+import os # Import os for file handling.
+
+# Span tracer writing the Chrome trace event format (load the file in chrome://tracing or ui.perfetto.dev).
+# The file is a JSON array whose closing bracket is left out, which both viewers accept, so events can simply be appended.
+class Tracer:
+    def __init__(self, path=os.path.join("Data", "Trace.json"), max_bytes=5 * 1024 * 1024, backups=3, enabled=True):
+        self.path = path
+        self.max_bytes = max_bytes # The file is rotated to Trace.1.json, Trace.2.json, ... beyond this size.
+        self.backups = backups
+        self.enabled = enabled
+        self.turn = 0 # Number of the turn in progress; recorded on every event.
+        self._lock = threading.Lock()
+        self._file = None
+        self._named_threads = set()
+        self._pid = os.getpid()
+        # Map perf_counter onto wall-clock microseconds so events of different runs sort correctly.
+        self._base = time.time() * 1e6 - time.perf_counter() * 1e6
+
+    def _Now(self):
+        return self._base + time.perf_counter() * 1e6
+
+    # Open the trace file, starting a new array when it is empty.
+    def _Open(self):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+            if self._file.tell() == 0:
+                self._file.write("[\n")
+        return self._file
+
+    # Move full files aside: Trace.json -> Trace.1.json -> Trace.2.json ...
+    def _Rotate(self):
+        self._file.close()
+        self._file = None
+        root, extension = os.path.splitext(self.path)
+        for number in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{root}.{number}{extension}"):
+                os.replace(f"{root}.{number}{extension}", f"{root}.{number + 1}{extension}")
+        os.replace(self.path, f"{root}.1{extension}")
+
+    def _Write(self, event):
+        tid = threading.get_ident()
+        with self._lock:
+            f = self._Open()
+            if tid not in self._named_threads:
+                self._named_threads.add(tid)
+                f.write(json.dumps({"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid,
+                                    "args": {"name": threading.current_thread().name}}) + ",\n")
+            f.write(json.dumps(dict(event, pid=self._pid, tid=tid)) + ",\n")
+            if f.tell() > self.max_bytes:
+                self._Rotate()
+                self._named_threads.clear()
+
+    # Time a block of code as one stage; extra keyword arguments are stored with the event.
+    @contextmanager
+    def Span(self, name, **args):
+        if not self.enabled:
+            yield args
+            return
+        turn = self.turn
+        start = self._Now()
+        try:
+            yield args # The block may add details, e.g. args["cached"] = True.
+        finally:
+            self._Write({"name": name, "cat": name.split(".")[0], "ph": "X", "ts": start, "dur": self._Now() - start,
+                         "args": dict(args, turn=turn)})
+
+    # Record a stage that started at `start` (a perf_counter value) and ends now, for spans that cross threads.
+    def Complete(self, name, start, **args):
+        if self.enabled:
+            begin = self._base + start * 1e6
+            self._Write({"name": name, "cat": name.split(".")[0], "ph": "X", "ts": begin, "dur": self._Now() - begin,
+                         "args": dict(args, turn=self.turn)})
+
+    # Time a stream of text deltas: time to the first delta and the whole generation.
+    def Stream(self, name, deltas, **args):
+        start = time.perf_counter()
+        first = True
+        for delta in deltas:
+            if first:
+                self.Complete(f"{name}.first_token", start, **args)
+                first = False
+            yield delta
+        self.Complete(f"{name}.generation", start, **args)
+
+    # Start a new turn; every span recorded until the next one belongs to it.
+    @contextmanager
+    def Turn(self):
+        with self._lock:
+            self.turn += 1
+        try:
+            with self.Span("turn"):
+                yield self.turn
+        finally:
+            self.Flush()
+
+    # Write buffered events to disk.
+    def Flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    # Continue the turn numbering of earlier runs; only the tail of the newest file is read.
+    def Resume(self):
+        for file_path in reversed(TraceFiles(self.path)):
+            if not os.path.exists(file_path):
+                continue
+            with open(file_path, "rb") as f:
+                f.seek(max(0, os.path.getsize(file_path) - 64 * 1024))
+                turns = [event["args"]["turn"] for event in ParseEvents(f.read().decode("utf-8", "ignore").splitlines())
+                         if "turn" in event.get("args", {})]
+            if turns:
+                self.turn = max(turns)
+                return
+
+# The trace file and its rotated predecessors, oldest first.
+def TraceFiles(path):
+    root, extension = os.path.splitext(path)
+    rotated = []
+    for file_path in glob.glob(f"{root}.*{extension}"):
+        number = file_path[len(root) + 1:-len(extension)]
+        if number.isdigit():
+            rotated.append((int(number), file_path))
+    return [file_path for _, file_path in sorted(rotated, reverse=True)] + [path]
+
+# Parse event lines, skipping the array bracket and lines cut short by a crash.
+def ParseEvents(lines):
+    events = []
+    for line in lines:
+        line = line.strip().rstrip(",")
+        if line.startswith("{"):
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                pass
+    return events
+
+# Read the events of a trace file and its rotated predecessors, oldest first.
+def ReadEvents(path=os.path.join("Data", "Trace.json")):
+    events = []
+    for file_path in TraceFiles(path):
+        if os.path.exists(file_path):
+            with open(file_path, "r", encoding="utf-8") as f:
+                events.extend(ParseEvents(f))
+    return events
+
+# Value at the given percentile, nearest-rank method.
+def Percentile(values, percent):
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+# Duration percentiles in milliseconds per stage over the last `turns` turns.
+def Summary(turns=50, path=os.path.join("Data", "Trace.json")):
+    events = [event for event in ReadEvents(path) if event.get("ph") == "X" and "turn" in event.get("args", {})]
+    recent = set(sorted({event["args"]["turn"] for event in events})[-turns:])
+    stages = {}
+    for event in events:
+        if event["args"]["turn"] in recent:
+            stages.setdefault(event["name"], []).append(event["dur"] / 1000)
+    return {name: {"count": len(values), "p50": Percentile(values, 50), "p95": Percentile(values, 95), "p99": Percentile(values, 99)}
+            for name, values in sorted(stages.items())}
+
+# Shared tracer used by Main and every backend module.
+Trace = Tracer(
+    max_bytes=int(env_vars.get("TraceFileSize", 5)) * 1024 * 1024,
+    enabled=str(env_vars.get("TraceTurns", "True")).lower() == "true"
+)
+Trace.Resume()
+atexit.register(Trace.Flush)
+
+# Command line entry point: python -m Backend.Tracing summary [turns]
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "summary":
+        turns = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+        print(f"Stage latency over the last {turns} turns (ms):")
+        print(f"  {'stage':<28}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}")
+        for name, stats in Summary(turns).items():
+            print(f"  {name:<28}{stats['count']:>7}{stats['p50']:>10.1f}{stats['p95']:>10.1f}{stats['p99']:>10.1f}")
+    else:
+        print("Usage: python -m Backend.Tracing summary [turns]")
@@ -0,0 +1,93 @@
+from concurrent.futures import Future, TimeoutError # Import Future to hand a translation back from its thread.
+from Backend.Cache import PersistentCache # Import the persistent TTL/LRU cache.
+import threading # Import threading to run translations with a deadline.
+import unicodedata # Import unicodedata to detect the script of the text.
+import re # Import re to split text into words.
+import os # Import os for the cache path.
+
+# Common English words; Latin-script text made mostly of these is taken to be English already.
+EnglishWords = set("""
+a about after all am an and any are as at be because been before but by can could did do does doing down for from get give go
+good had has have he hello her here hey hi him his how i if in into is it its just know let like me more most my no not now of
+off on one open or our out please play search set show so some start stop tell than thank thanks that the their them then there
+these they this time to today turn up us was we weather were what when where which who why will with would write yes you your
+close exit quit bye volume mute unmute system generate image images picture google youtube news song music video app chrome
+""".split())
+
+Words = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+# Return True if the text is in Latin script and mostly made of common English words.
+def LooksEnglish(text, threshold=0.5):
+    words = Words.findall(text.lower())
+    if not words:
+        return True # Nothing to translate.
+    for char in "".join(words):
+        if ord(char) > 0x24F and not unicodedata.name(char, "").startswith("LATIN"):
+            return False # Devanagari, Arabic, CJK and other scripts always need translation.
+    known = sum(1 for word in words if word in EnglishWords)
+    return known / len(words) >= threshold
+
+# Translation to English that skips text which is English already, remembers recent translations
+# and gives up after a deadline, returning the original text rather than stalling the turn.
+class Translator:
+    def __init__(self, translate, cache, timeout=3.0):
+        self.translate = translate # translate(text) -> English text; may block on the network.
+        self.cache = cache
+        self.timeout = timeout # Seconds to wait before falling through to the original text.
+        self._lock = threading.Lock()
+        self.skipped = 0 # Texts detected as English locally.
+        self.translated = 0 # Texts sent to the translation endpoint.
+        self.timeouts = 0 # Translations that missed the deadline.
+        self.errors = 0
+
+    # Run the translation on a daemon thread so a hung request never blocks shutdown.
+    def _Start(self, text, key):
+        future = Future()
+
+        def Worker():
+            try:
+                result = self.translate(text)
+                self.cache.Set(key, result) # A late result still helps the next time the same text is said.
+                future.set_result(result)
+            except Exception as e:
+                future.set_exception(e)
+
+        threading.Thread(target=Worker, name="Translate", daemon=True).start()
+        return future
+
+    # Return the English text, or the original text if it cannot be translated in time.
+    def Translate(self, text):
+        if LooksEnglish(text):
+            with self._lock:
+                self.skipped += 1
+            return text
+
+        key = " ".join(text.lower().split())
+        cached = self.cache.Get(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            self.translated += 1
+        try:
+            return self._Start(text, key).result(self.timeout)
+        except TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            print(f"Translation took longer than {self.timeout}s; using the original text.")
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            print(f"Translation error: {e}")
+        return text
+
+    # Counters of the local detection, the cache and the endpoint.
+    def Stats(self):
+        with self._lock:
+            stats = {"skipped": self.skipped, "translated": self.translated, "timeouts": self.timeouts, "errors": self.errors}
+        stats["cache"] = self.cache.Stats()
+        return stats
+
+# Function to create the translation cache file under Data.
+def TranslationCache(max_entries=500, ttl=30 * 24 * 3600):
+    return PersistentCache(os.path.join("Data", "TranslationCache.sqlite"), max_entries=max_entries, ttl=ttl)
@@ -1,16 +1,23 @@
 from PyQt5.QtWidgets import QApplication, QMainWindow, QTextEdit, QStackedWidget, QWidget, QLineEdit, QGridLayout, QVBoxLayout, QHBoxLayout, QPushButton, QFrame, QLabel, QSizePolicy
-from PyQt5.QtGui import QIcon, QPainter, QMovie, QColor, QTextCharFormat, QFont, QPixmap, QTextBlockFormat
-from PyQt5.QtCore import Qt, QSize, QTimer
-from dotenv import dotenv_values
+from PyQt5.QtGui import QIcon, QPainter, QMovie, QColor, QTextCharFormat, QFont, QPixmap, QTextBlockFormat, QTextCursor
+from PyQt5.QtCore import Qt, QSize, QTimer, QObject, pyqtSignal
+from Backend.EventBus import Bus, FileMirrorSink
+from Backend.Config import env_vars
+from Backend.Startup import Startup
 import sys
 import os
 
-env_vars = dotenv_values(".env")
 Assistantname = env_vars.get("Assistantname")
 current_dir = os.getcwd()
-old_chat_message = ""
 TempDirPath = rf"{current_dir}\Frontend\Files"
 GraphicsDirPath = rf"{current_dir}\Frontend\Graphics"
+StreamRepaintInterval = int(env_vars.get("StreamRepaintInterval", 50))
+ChatBlockLimit = int(env_vars.get("ChatBlockLimit", 2000))
+ChatPageSize = int(env_vars.get("ChatPageSize", 50))
+ChatHistorySource = None
+
+if str(env_vars.get("MirrorStateFiles", "")).lower() == "true":
+    Bus.AddSink(FileMirrorSink(TempDirPath))
 
 def AnswerModifier(Answer):
     lines = Answer.split('\n')
@@ -35,22 +42,19 @@ def QueryModifier(Query):
     return new_query.capitalize()
 
 def SetMicrophoneStatus(Command):
-    with open(rf'{TempDirPath}\Mic.data', "w", encoding='utf-8') as file:
-        file.write(Command)
+    Bus.Publish("Mic", Command)
 
 def GetMicrophoneStatus():
-    with open(rf'{TempDirPath}\Mic.data', "r", encoding='utf-8') as file:
-        Status = file.read()
-    return Status
+    return Bus.Get("Mic")
+
+def WaitForMicrophoneStatus(Command, Timeout=None):
+    return Bus.WaitFor("Mic", Command, timeout=Timeout)
 
 def SetAssistantStatus(Status):
-    with open(rf'{TempDirPath}\Status.data', "w", encoding='utf-8') as file:
-        file.write(Status)
+    Bus.Publish("Status", Status)
 
 def GetAssistantStatus():
-    with open(rf'{TempDirPath}\Status.data', "r", encoding='utf-8') as file:
-        Status = file.read()
-    return Status
+    return Bus.Get("Status")
 
 def MicButtonInitialed():
     SetMicrophoneStatus("False")
@@ -67,8 +71,74 @@ def TempDirectoryPath(Filename):
     return Path
 
 def ShowTextToScreen(Text):
-    with open(rf'{TempDirPath}\Responses.data', "w", encoding='utf-8') as file:
-        file.write(Text)
+    Bus.Publish("Responses", Text, force=True)
+
+def StreamTextToScreen(Prefix, Deltas):
+    Bus.Publish("StreamStart", Prefix, force=True)
+    Text = ""
+    try:
+        for Delta in Deltas:
+            Text += Delta
+            Bus.Publish("StreamDelta", Delta, force=True)
+    finally:
+        Text = AnswerModifier(Text)
+        Bus.Publish("StreamEnd", Prefix + Text, force=True)
+    return Text
+
+def SetChatHistorySource(Source):
+    # Source(count) returns up to `count` messages older than those it returned before, oldest first.
+    global ChatHistorySource
+    ChatHistorySource = Source
+
+class ChatModel:
+    # Append-only list of chat messages; each message keeps its id while older history is prepended.
+    def __init__(self):
+        self.messages = []
+        self.next_id = 0
+
+    def __len__(self):
+        return len(self.messages)
+
+    def _New(self, text):
+        self.next_id += 1
+        return {"id": self.next_id, "text": text}
+
+    def Append(self, text):
+        self.messages.append(self._New(text))
+        return len(self.messages) - 1
+
+    def Prepend(self, texts):
+        self.messages[:0] = [self._New(text) for text in texts]
+        return len(texts)
+
+    def Text(self, index):
+        return self.messages[index]["text"]
+
+    def Update(self, index, text):
+        self.messages[index]["text"] = text
+
+    def IndexOf(self, message_id):
+        for index in range(len(self.messages) - 1, -1, -1):
+            if self.messages[index]["id"] == message_id:
+                return index
+        return None
+
+class GUIEventBridge(QObject):
+    StatusChanged = pyqtSignal(str)
+    ResponsesChanged = pyqtSignal(str)
+    StreamStarted = pyqtSignal(str)
+    StreamDelta = pyqtSignal(str)
+    StreamEnded = pyqtSignal(str)
+    ImageStatusChanged = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        Bus.Subscribe("Status", self.StatusChanged.emit)
+        Bus.Subscribe("Responses", self.ResponsesChanged.emit)
+        Bus.Subscribe("StreamStart", self.StreamStarted.emit)
+        Bus.Subscribe("StreamDelta", self.StreamDelta.emit)
+        Bus.Subscribe("StreamEnd", self.StreamEnded.emit)
+        Bus.Subscribe("ImageStatus", self.ImageStatusChanged.emit)
 
 class ChatSection(QWidget):
     def __init__(self):
@@ -103,15 +173,36 @@ class ChatSection(QWidget):
         self.label.setStyleSheet("color: white; font-size:16px; margin-right: 195px; border: none; margin-top: -30px;")
         self.label.setAlignment(Qt.AlignRight)
         layout.addWidget(self.label)
+        self.image_label = QLabel("")
+        self.image_label.setStyleSheet("color: gray; font-size:13px; margin-right: 195px; border: none;")
+        self.image_label.setAlignment(Qt.AlignRight)
+        layout.addWidget(self.image_label)
         layout.setSpacing(-10)
         layout.addWidget(self.gif_label)
         font = QFont()
         font.setPointSize(13)
         self.chat_text_edit.setFont(font)
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.loadMessages)
-        self.timer.timeout.connect(self.SpeechRecogText)
-        self.timer.start(5)
+        self.model = ChatModel()
+        self.low = 0
+        self.high = 0
+        self.rendered_blocks = []
+        self.stream_id = None
+        self.history_exhausted = False
+        self.chat_text_edit.document().setMaximumBlockCount(ChatBlockLimit)
+        self.chat_text_edit.verticalScrollBar().valueChanged.connect(self.scrolled)
+        self.pending_stream_text = ""
+        self.stream_timer = QTimer(self)
+        self.stream_timer.setSingleShot(True)
+        self.stream_timer.timeout.connect(self.flushStream)
+        self.bridge = GUIEventBridge(self)
+        self.bridge.ResponsesChanged.connect(self.loadMessages)
+        self.bridge.StatusChanged.connect(self.SpeechRecogText)
+        self.bridge.StreamStarted.connect(self.startStream)
+        self.bridge.StreamDelta.connect(self.appendStream)
+        self.bridge.StreamEnded.connect(self.endStream)
+        self.bridge.ImageStatusChanged.connect(self.image_label.setText)
+        self.loadMessages(Bus.Get("Responses"))
+        self.SpeechRecogText(Bus.Get("Status"))
         self.chat_text_edit.viewport().installEventFilter(self)
         self.setStyleSheet("""
             QScrollBar:vertical {
@@ -146,24 +237,152 @@ class ChatSection(QWidget):
             }
         """)
 
-    def loadMessages(self):
-        global old_chat_message
-        with open(TempDirectoryPath('Responses.data'), "r", encoding='utf-8') as file:
-            messages = file.read()
-            if None == messages:
-                pass
-            elif len(messages) <= 1:
-                pass
-            elif str(old_chat_message) == str(messages):
-                pass
-            else:
-                self.addMessage(message=messages, color='White')
-                old_chat_message = messages
+    def loadMessages(self, messages):
+        if len(messages) <= 1:
+            return
+        self.addMessage(messages)
 
-    def SpeechRecogText(self):
-        with open(TempDirectoryPath('Status.data'), "r", encoding='utf-8') as file:
-            messages = file.read()
-            self.label.setText(messages)
+    def SpeechRecogText(self, messages):
+        self.label.setText(messages)
+
+    def blockFormats(self, cursor):
+        format = QTextCharFormat()
+        formatm = QTextBlockFormat()
+        formatm.setTopMargin(10)
+        formatm.setLeftMargin(10)
+        format.setForeground(QColor('White'))
+        cursor.setCharFormat(format)
+        cursor.setBlockFormat(formatm)
+
+    def renderAtEnd(self, text):
+        cursor = QTextCursor(self.chat_text_edit.document())
+        cursor.movePosition(QTextCursor.End)
+        self.blockFormats(cursor)
+        cursor.insertText(("\n" if self.rendered_blocks else "") + text)
+        self.rendered_blocks.append(text.count("\n") + 1)
+
+    def renderAtTop(self, text):
+        cursor = QTextCursor(self.chat_text_edit.document())
+        cursor.movePosition(QTextCursor.Start)
+        self.blockFormats(cursor)
+        cursor.insertText(text + ("\n" if self.rendered_blocks else ""))
+        self.rendered_blocks.insert(0, text.count("\n") + 1)
+
+    def removeFromTop(self):
+        blocks = self.rendered_blocks.pop(0)
+        cursor = QTextCursor(self.chat_text_edit.document())
+        cursor.movePosition(QTextCursor.Start)
+        if self.rendered_blocks:
+            cursor.movePosition(QTextCursor.NextBlock, QTextCursor.KeepAnchor, blocks)
+        else:
+            cursor.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+        self.low += 1
+
+    def removeFromBottom(self):
+        blocks = self.rendered_blocks.pop()
+        document = self.chat_text_edit.document()
+        cursor = QTextCursor(document)
+        if self.rendered_blocks:
+            cursor.setPosition(document.findBlockByNumber(document.blockCount() - blocks - 1).position())
+            cursor.movePosition(QTextCursor.EndOfBlock)
+        cursor.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+        self.high -= 1
+
+    def fitWindow(self, from_top):
+        trimmed = sum(self.rendered_blocks) - self.chat_text_edit.document().blockCount()
+        if trimmed > 0 and self.rendered_blocks:
+            self.rendered_blocks[0] -= trimmed
+        # Whole messages are dropped before the document's own block limit would cut one in half.
+        while len(self.rendered_blocks) > 1 and sum(self.rendered_blocks) > ChatBlockLimit - 1:
+            if from_top:
+                self.removeFromTop()
+            else:
+                self.removeFromBottom()
+
+    def addMessage(self, message):
+        live = self.high == len(self.model)
+        index = self.model.Append(message)
+        if live:
+            self.renderAtEnd(message)
+            self.high = index + 1
+            self.fitWindow(from_top=True)
+            self.chat_text_edit.verticalScrollBar().setValue(self.chat_text_edit.verticalScrollBar().maximum())
+        return self.model.messages[index]["id"]
+
+    def scrolled(self, value):
+        scrollbar = self.chat_text_edit.verticalScrollBar()
+        if value == scrollbar.minimum() and scrollbar.maximum() > 0:
+            self.pageUp()
+        elif value == scrollbar.maximum() and self.high < len(self.model):
+            self.pageDown()
+
+    def pageUp(self):
+        if self.low == 0 and not self.history_exhausted and ChatHistorySource is not None:
+            older = ChatHistorySource(ChatPageSize)
+            if not older:
+                self.history_exhausted = True
+            added = self.model.Prepend(older)
+            self.low += added
+            self.high += added
+        if self.low == 0:
+            return
+        scrollbar = self.chat_text_edit.verticalScrollBar()
+        old_maximum = scrollbar.maximum()
+        for index in range(self.low - 1, max(self.low - ChatPageSize, 0) - 1, -1):
+            self.renderAtTop(self.model.Text(index))
+            self.low = index
+        self.fitWindow(from_top=False)
+        scrollbar.setValue(scrollbar.maximum() - old_maximum)
+
+    def pageDown(self):
+        scrollbar = self.chat_text_edit.verticalScrollBar()
+        old_value = scrollbar.value()
+        old_maximum = scrollbar.maximum()
+        for index in range(self.high, min(self.high + ChatPageSize, len(self.model))):
+            self.renderAtEnd(self.model.Text(index))
+            self.high = index + 1
+        self.fitWindow(from_top=True)
+        scrollbar.setValue(old_value - (old_maximum - scrollbar.maximum()) if scrollbar.maximum() < old_maximum else old_value)
+
+    def startStream(self, prefix):
+        self.flushStream()
+        self.stream_id = self.addMessage(prefix)
+
+    def appendStream(self, delta):
+        self.pending_stream_text += delta
+        if not self.stream_timer.isActive():
+            self.stream_timer.start(StreamRepaintInterval)
+
+    def flushStream(self):
+        self.stream_timer.stop()
+        if not self.pending_stream_text:
+            return
+        index = self.model.IndexOf(self.stream_id)
+        if index is not None:
+            self.model.Update(index, self.model.Text(index) + self.pending_stream_text)
+            if index == self.high - 1:
+                cursor = QTextCursor(self.chat_text_edit.document())
+                cursor.movePosition(QTextCursor.End)
+                cursor.insertText(self.pending_stream_text)
+                self.rendered_blocks[-1] += self.pending_stream_text.count("\n")
+                self.fitWindow(from_top=True)
+                self.chat_text_edit.verticalScrollBar().setValue(self.chat_text_edit.verticalScrollBar().maximum())
+        self.pending_stream_text = ""
+
+    def endStream(self, text):
+        self.flushStream()
+        index = self.model.IndexOf(self.stream_id)
+        self.stream_id = None
+        if index is None:
+            return
+        self.model.Update(index, text)
+        if index == self.high - 1:
+            self.removeFromBottom()
+            self.renderAtEnd(text)
+            self.high = index + 1
+            self.fitWindow(from_top=True)
 
     def load_icon(self, path, width=60, height=60):
         pixmap = QPixmap(path)
@@ -179,17 +398,6 @@ class ChatSection(QWidget):
             MicButtonClosed()
             self.toggled = not self.toggled
 
-    def addMessage(self, message, color):
-        cursor = self.chat_text_edit.textCursor()
-        format = QTextCharFormat()
-        formatm = QTextBlockFormat()
-        formatm.setTopMargin(10)
-        formatm.setLeftMargin(10)
-        format.setForeground(QColor(color))
-        cursor.setCharFormat(format)
-        cursor.setBlockFormat(formatm)
-        cursor.insertText(message + "\n")
-        self.chat_text_edit.setTextCursor(cursor)
 
 class InitialScreen(QWidget):
     def __init__(self, parent=None):
@@ -226,14 +434,12 @@ class InitialScreen(QWidget):
         self.setFixedHeight(screen_height)
         self.setFixedWidth(screen_width)
         self.setStyleSheet("background-color: black;")
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.SpeechRecogText)
-        self.timer.start(5)
+        self.bridge = GUIEventBridge(self)
+        self.bridge.StatusChanged.connect(self.SpeechRecogText)
+        self.SpeechRecogText(Bus.Get("Status"))
 
-    def SpeechRecogText(self):
-        with open(TempDirectoryPath('Status.data'), "r", encoding='utf-8') as file:
-            messages = file.read()
-            self.label.setText(messages)
+    def SpeechRecogText(self, messages):
+        self.label.setText(messages)
 
     def load_icon(self, path, width=60, height=60):
         pixmap = QPixmap(path)
@@ -395,6 +601,7 @@ def GraphicalUserInterface():
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
+    Startup.Mark("gui")
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
@@ -2,91 +2,115 @@ from Frontend.GUI import (
     GraphicalUserInterface,
     SetAssistantStatus,
     ShowTextToScreen,
-    TempDirectoryPath,
+    StreamTextToScreen,
     SetMicrophoneStatus,
     AnswerModifier,
     QueryModifier,
     GetMicrophoneStatus,
-    GetAssistantStatus
+    GetAssistantStatus,
+    WaitForMicrophoneStatus,
+    SetChatHistorySource,
+    ChatPageSize
 )
-from Backend.Model import FirstLayerDMM
-from Backend.RealtimeSearchEngine import RealtimeSearchEngine
+from Backend.Model import FirstLayerDMMAsync, FastPath
+from Backend.RealtimeSearchEngine import RealtimeSearchEngineStream, Prefetcher
 from Backend.Automation import Automation
-from Backend.SpeechToText import SpeechRecognition
-from Backend.Chatbot import ChatBot
-from Backend.TextToSpeech import TextToSpeech
-from dotenv import dotenv_values
-from asyncio import run
-from time import sleep
-import subprocess
+from Backend.SpeechToText import SpeechRecognition, Recognizer
+from Backend.Chatbot import ChatBotStream
+from Backend.ChatLogStore import ChatLog
+from Backend.Conversation import Conversation
+from Backend.AppIndex import Apps
+from Backend.TextToSpeech import SpeechPipeline, WarmSpeechCache, Player, responses
+from Backend.EventLoop import RunAsync
+from Backend.ImageGeneration import Worker as ImageWorker
+from Backend.Config import env_vars, GroqClient, CohereClient
+from Backend.Startup import Startup
+from Backend.Tracing import Trace
+import asyncio
 import threading
-import json
 import os
 
-env_vars = dotenv_values(".env")
+Startup.Mark("imports")
+
 Username = env_vars.get("Username")
 Assistantname = env_vars.get("Assistantname")
+SpeculativeSearch = str(env_vars.get("SpeculativeSearch", "True")).lower() == "true"
 
 DefaultMessage = f"""{Username} : Hello {Assistantname}, How are you?
 {Assistantname} : Welcome {Username}. I am doing well. How may I help you?"""
 
-subprocesses = []
 Functions = ["open", "close", "play", "system", "content", "google search", "youtube search"]
 
-def ShowDefaultChatIfNoChats():
-    with open(r'Data\ChatLog.json', "r", encoding='utf-8') as File:
-        if len(File.read()) < 5:
-            with open(TempDirectoryPath('Database.data'), 'w', encoding='utf-8') as file:
-                file.write("")
-            with open(TempDirectoryPath('Responses.data'), 'w', encoding='utf-8') as file:
-                file.write(DefaultMessage)
-
-def ReadChatLogJson():
-    with open(r'Data\ChatLog.json', 'r', encoding='utf-8') as file:
-        chatlog_data = json.load(file)
-    return chatlog_data
-
-def ChatLogIntegration():
-    json_data = ReadChatLogJson()
-    formatted_chatlog = ""
-    for entry in json_data:
-        if entry["role"] == "user":
-            formatted_chatlog += f"User: {entry['content']}\n"
-        elif entry["role"] == "assistant":
-            formatted_chatlog += f"Assistant: {entry['content']}\n"
-    formatted_chatlog = formatted_chatlog.replace("User", Username + " ")
-    formatted_chatlog = formatted_chatlog.replace("Assistant", Assistantname + " ")
-    with open(TempDirectoryPath('Database.data'), 'w', encoding='utf-8') as file:
-        file.write(AnswerModifier(formatted_chatlog))
-
-def ShowChatsOnGUI():
-    with open(TempDirectoryPath('Database.data'), "r", encoding='utf-8') as File:
-        Data = File.read()
-        if len(str(Data)) > 0:
-            lines = Data.split('\n')
-            result = '\n'.join(lines)
-        with open(TempDirectoryPath('Responses.data'), "w", encoding='utf-8') as File:
-            File.write(result)
+def FormatChatMessage(entry):
+    Speaker = Username if entry["role"] == "user" else Assistantname
+    return f"{Speaker} : {AnswerModifier(entry['content'])}"
+
+def ChatHistoryPages():
+    # Pages backwards through the chat log via its offset index; each call returns the next older page, oldest first.
+    End = ChatLog.TurnCount()
+
+    def OlderMessages(Count):
+        nonlocal End
+        Start = max(0, End - max(1, (Count + 1) // 2))
+        Messages = [FormatChatMessage(entry) for turn in ChatLog.IterTurns(Start, End) for entry in turn if entry["role"] in ("user", "assistant")]
+        End = Start
+        return Messages
+
+    return OlderMessages
+
+def ShowChatHistory():
+    History = ChatHistoryPages()
+    Recent = History(ChatPageSize)
+    if not Recent:
+        ShowTextToScreen(DefaultMessage)
+    for Message in Recent:
+        ShowTextToScreen(Message)
+    SetChatHistorySource(History)
 
 def InitialExecution():
     SetMicrophoneStatus("False")
     ShowTextToScreen("")
-    ShowDefaultChatIfNoChats()
-    ChatLogIntegration()
-    ShowChatsOnGUI()
+    ShowChatHistory()
+
+# Subsystems prepared in parallel while the window is already up; anything not ready yet is created on first use instead.
+WarmupTasks = {
+    "speech recognizer": Recognizer.Warm,
+    "groq client": GroqClient,
+    "cohere client": CohereClient,
+    "audio device": Player.Warm,
+    "speech cache": lambda: WarmSpeechCache(responses, Background=False),
+    "app index": Apps.Start,
+    "conversation": Conversation.Load,
+}
+
+async def SpeakStream(Deltas):
+    with Trace.Span("answer"):
+        Speech = SpeechPipeline()
+        Answer = await asyncio.to_thread(StreamTextToScreen, f"{Assistantname} : ", Speech.Tee(Deltas))
+        SetAssistantStatus("Answering ... ")
+        await asyncio.to_thread(Speech.Wait)
+        return Answer
 
-InitialExecution()
+async def WaitForTasks(Tasks):
+    for Result in await asyncio.gather(*Tasks, return_exceptions=True):
+        if isinstance(Result, Exception):
+            print(f"Error in automation: {Result}")
 
-def MainExecution():
+async def MainExecutionAsync():
     TaskExecution = False
     ImageExecution = False
     ImageGenerationQuery = ""
+    Tasks = []
 
     SetAssistantStatus("Listening ... ")
-    Query = SpeechRecognition()
+    Query = await asyncio.to_thread(SpeechRecognition)
     ShowTextToScreen(f"{Username} : {Query}")
     SetAssistantStatus("Thinking ... ")
-    Decision = FirstLayerDMM(Query)
+    Prefetch = None
+    if SpeculativeSearch and FastPath.Classify(Query)[1] < FastPath.threshold:
+        Prefetch = Prefetcher.Start(Query)
+    with Trace.Span("decision"):
+        Decision = await FirstLayerDMMAsync(Query)
 
     print("")
     print(f"Decision : {Decision}")
@@ -95,9 +119,14 @@ def MainExecution():
     G = any([i for i in Decision if i.startswith("general")])
     R = any([i for i in Decision if i.startswith("realtime")])
     Merged_query = " and ".join(
-        ["".join(i.split()[1:]) for i in Decision if i.startswith("general") or i.startswith("realtime")]
+        [" ".join(i.split()[1:]) for i in Decision if i.startswith("general") or i.startswith("realtime")]
     )
 
+    if Prefetch is not None and not R:
+        Prefetcher.Discard(Prefetch)
+        Prefetch = None
+        print(f"Speculative search : {Prefetcher.Report()}")
+
     for queries in Decision:
         if "generate" in queries:
             ImageGenerationQuery = str(queries)
@@ -106,77 +135,68 @@ def MainExecution():
     for queries in Decision:        
         if not TaskExecution:
             if any(queries.startswith(func) for func in Functions):
-                run(Automation(list(Decision)))
+                Tasks.append(asyncio.create_task(Automation(list(Decision))))
                 TaskExecution = True
 
     if ImageExecution:
-        with open(r"Frontend\Files\ImageGeneration.data", "w") as file:
-            file.write(f"{ImageGenerationQuery},True")
-
-        try:
-            p1 = subprocess.Popen(
-                ['python', r'Backend\ImageGeneration.py'],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                stdin=subprocess.PIPE, shell=False
-            )
-            subprocesses.append(p1)
-
-        except Exception as e:
-            print(f"Error starting ImageGeneration.py: {e}")
-
-    if G and R or R:
-        SetAssistantStatus("Searching ... ")
-        Answer = RealtimeSearchEngine(QueryModifier(Merged_query))
-        ShowTextToScreen(f"{Assistantname} : {Answer}")
-        SetAssistantStatus("Answering ... ")
-        TextToSpeech(Answer)
-        return True
-
-    else:
-        for Queries in Decision:
-            if "general" in Queries:
-                SetAssistantStatus("Thinking ... ")
-                QueryFinal = Queries.replace("general ", "")
-                Answer = ChatBot(QueryModifier(QueryFinal))
-                ShowTextToScreen(f"{Assistantname} : {Answer}")
-                SetAssistantStatus("Answering ... ")
-                TextToSpeech(Answer)
-                return True
-
-            elif "realtime" in Queries:
-                SetAssistantStatus("Searching ... ")
-                QueryFinal = Queries.replace("realtime ", "")
-                Answer = RealtimeSearchEngine(QueryModifier(QueryFinal))
-                ShowTextToScreen(f"{Assistantname} : {Answer}")
-                SetAssistantStatus("Answering ... ")
-                TextToSpeech(Answer)
-                return True
-
-            elif "exit" in Queries:
-                QueryFinal = "Okay, Bye!"
-                Answer = ChatBot(QueryModifier(QueryFinal))
-                ShowTextToScreen(f"{Assistantname} : {Answer}")
-                SetAssistantStatus("Answering ... ")
-                TextToSpeech(Answer)
-                SetAssistantStatus("Answering ... ")
-                os._exit(1)
+        ImageWorker.Submit(ImageGenerationQuery.removeprefix("generate image").strip())
+
+    try:
+        if G and R or R:
+            SetAssistantStatus("Searching ... ")
+            QueryFinal = QueryModifier(Merged_query)
+            # A turn that is one realtime question is the utterance itself, however the decision model worded it.
+            SameRequest = len(Decision) == 1
+            Prefetched = await asyncio.to_thread(Prefetcher.Use, Prefetch, QueryFinal, SameRequest) if Prefetch is not None else None
+            print(f"Speculative search : {Prefetcher.Report()}")
+            await SpeakStream(RealtimeSearchEngineStream(QueryFinal, Prefetched))
+            return True
+
+        else:
+            for Queries in Decision:
+                if "general" in Queries:
+                    SetAssistantStatus("Thinking ... ")
+                    QueryFinal = Queries.replace("general ", "")
+                    await SpeakStream(ChatBotStream(QueryModifier(QueryFinal)))
+                    return True
+
+                elif "exit" in Queries:
+                    QueryFinal = "Okay, Bye!"
+                    await SpeakStream(ChatBotStream(QueryModifier(QueryFinal)))
+                    SetAssistantStatus("Answering ... ")
+                    await WaitForTasks(Tasks)
+                    Trace.Flush()
+                    Conversation.Flush()
+                    os._exit(1)
+
+    finally:
+        await WaitForTasks(Tasks)
+
+def MainExecution():
+    with Trace.Turn():
+        return RunAsync(MainExecutionAsync())
 
 def FirstThread():
+    # The chat history is shown once the window can receive it.
+    Startup.WaitForMark("gui")
+    with Startup.Measure("chat history"):
+        InitialExecution()
+
     while True:
         CurrentStatus = GetMicrophoneStatus()
         if CurrentStatus == "True":
             MainExecution()
         else:
             AIStatus = GetAssistantStatus()
-            if "Available ... " in AIStatus:
-                sleep(0.1)
-            else:
+            if "Available ... " not in AIStatus:
                 SetAssistantStatus("Available ... ")
+            WaitForMicrophoneStatus("True")
 
 def SecondThread():
     GraphicalUserInterface()
 
 if __name__ == "__main__":
+    Startup.Warmup(WarmupTasks)
     thread2 = threading.Thread(target=FirstThread, daemon=True)
     thread2.start()
     SecondThread()